@@ -1,16 +1,26 @@
+import os
 from flask import Flask
 from flask_cors import CORS
-from app.extensions import db, migrate, bcrypt, jwt
+from app.extensions import db, migrate, bcrypt, jwt, response_cache, password_hasher, replica_router, instrumentation, job_queue, toggle_buffer
 from app.routes.plant_routes import plants_bp
 from app.routes.user_routes import users_bp
-from config import Config
+from app.routes.upload_routes import uploads_bp
+from app.routes.ops_routes import ops_bp
+from app.commands import plants_cli, uploads_cli, ops_cli, jobs_cli
+from app.db_pool import engine_options
+from app.json_provider import make_json_provider
+from app.s3_helper import url_cache
+from config import config as configs
 
 
-def create_app(config=None):
+def create_app(config=None, config_name=None):
     app = Flask(__name__)
     CORS(app)
 
-    app.config.from_object(Config)
+    config_name = config_name or os.getenv('APP_ENV', 'default')
+    if config_name not in configs:
+        raise RuntimeError(f"Unknown APP_ENV {config_name}. Expected one of: {', '.join(configs)}.")
+    app.config.from_object(configs[config_name])
 
     if not app.config.get("SQLALCHEMY_DATABASE_URI"):
         raise RuntimeError("SQLALCHEMY_DATABASE_URI is not set. Please check your environment variables.")
@@ -23,13 +33,32 @@ def create_app(config=None):
         app.config.update(config)
 
     app.url_map.strict_slashes = False
+    app.json = make_json_provider(app)
 
+    # A 304 lets a client keep its image URLs for up to one ETag window, so cached URLs
+    # are only handed out while they have at least that long left
+    url_cache.safety_margin = max(url_cache.safety_margin, app.config['ETAG_URL_WINDOW'])
+
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
     db.init_app(app)
     migrate.init_app(app, db)
     bcrypt.init_app(app)
+    password_hasher.init_app(app)
     jwt.init_app(app)
+    response_cache.init_app(app)
+    replica_router.init_app(app)
+    instrumentation.init_app(app)
+    job_queue.init_app(app)
+    toggle_buffer.init_app(app)
 
     app.register_blueprint(plants_bp, url_prefix="/plants")
     app.register_blueprint(users_bp, url_prefix="/users")
+    app.register_blueprint(uploads_bp, url_prefix="/uploads")
+    app.register_blueprint(ops_bp, url_prefix="/ops")
+
+    app.cli.add_command(plants_cli)
+    app.cli.add_command(uploads_cli)
+    app.cli.add_command(ops_cli)
+    app.cli.add_command(jobs_cli)
 
     return app
@@ -0,0 +1,198 @@
+from collections import OrderedDict
+from functools import wraps
+import json
+import threading
+import time
+from flask import request, make_response
+
+
+class LocalCache:
+    """Thread-safe in-process LRU whose entries also expire after a TTL."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        # None keeps an entry until it is evicted; a TTL of zero or less means don't cache it
+        if ttl is not None and ttl <= 0:
+            return
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            value, expires_at = self._entries.get(key, (0, None))
+            self._entries[key] = (value + 1, expires_at)
+            self._entries.move_to_end(key)
+            return value + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class InMemorySharedBackend(LocalCache):
+    """Stand-in for a shared store (tests, single-process dev); never evicts by size."""
+
+    def __init__(self):
+        super().__init__(maxsize=float('inf'))
+        self._next_sweep = 0
+
+    def set(self, key, value, ttl=None):
+        super().set(key, value, ttl)
+        # Responses from old generations are never read again, so expired entries are swept here
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + 1
+            expired = [key for key, (_, expires_at) in self._entries.items()
+                       if expires_at is not None and now >= expires_at]
+            for key in expired:
+                del self._entries[key]
+
+
+class RedisBackend:
+    def __init__(self, url):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._redis.get(key)
+
+    def set(self, key, value, ttl=None):
+        if ttl is not None and ttl <= 0:
+            return
+        self._redis.set(key, value, ex=ttl)
+
+    def delete(self, key):
+        self._redis.delete(key)
+
+    def incr(self, key):
+        return self._redis.incr(key)
+
+
+class ResponseCache:
+    """Caches anonymous GET responses in a local LRU backed by an optional shared store.
+
+    Keys embed generation counters kept in the shared store, so invalidating a plant
+    (or the whole listing) is a single INCR that every worker observes on its next lookup.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.ttl = 30
+        self.local = LocalCache()
+        self.shared = None
+        self._local_generations = InMemorySharedBackend()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', 30)
+        self.local = LocalCache(maxsize=app.config.get('RESPONSE_CACHE_SIZE', 1024))
+
+        backend = app.config.get('RESPONSE_CACHE_BACKEND', 'local')
+        if backend == 'memory':
+            self.shared = InMemorySharedBackend()
+        elif backend == 'redis':
+            self.shared = RedisBackend(app.config['RESPONSE_CACHE_REDIS_URL'])
+        else:
+            self.shared = None
+
+        app.extensions['response_cache'] = self
+
+    def _generations(self):
+        # Without a shared store, invalidation is per-process and other workers rely on the TTL
+        return self.shared if self.shared is not None else self._local_generations
+
+    def generation(self, name):
+        value = self._generations().get(f'gen:{name}')
+        return int(value) if value else 0
+
+    def bump(self, name):
+        self._generations().incr(f'gen:{name}')
+
+    def invalidate_plant(self, plant_id, listing=False):
+        self.bump(f'plant:{plant_id}')
+        if listing:
+            self.bump('plants')
+
+    def invalidate_all(self):
+        self.bump('all')
+
+    def cached(self, scope):
+        """Cache a view for anonymous callers; `scope` maps the view kwargs to generation names."""
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or self.ttl <= 0 or request.method != 'GET' or 'Authorization' in request.headers:
+                    return view(*args, **kwargs)
+
+                generations = ','.join(
+                    str(self.generation(name)) for name in ['all', *scope(**kwargs)]
+                )
+                query = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+                key = f'resp:{request.endpoint}:{generations}:{request.path}?{query}'
+
+                cached = self.local.get(key)
+                if cached is None and self.shared is not None:
+                    cached = self.shared.get(key)
+                    if cached is not None:
+                        self.local.set(key, cached, self.ttl)
+
+                if cached is not None:
+                    response = make_response(_unpack(cached))
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    packed = _pack(response)
+                    self.local.set(key, packed, self.ttl)
+                    if self.shared is not None:
+                        self.shared.set(key, packed, self.ttl)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+
+            return wrapper
+
+        return decorator
+
+
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Vary')
+
+
+def _pack(response):
+    headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+    return json.dumps(headers).encode() + b'\n' + response.get_data()
+
+
+def _unpack(packed):
+    headers, body = packed.split(b'\n', 1)
+    return body, 200, json.loads(headers)
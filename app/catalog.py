@@ -0,0 +1,268 @@
+import csv
+import io
+import json
+from itertools import islice
+from app.extensions import db
+from app.models.plant import Plant, PlantImage
+
+FIELDS = ('name', 'description', 'main_image_url', 'images')
+# CSV keeps a plant's extra image keys in one column
+IMAGE_SEPARATOR = '|'
+
+
+class InvalidRecord(Exception):
+    pass
+
+
+def read_records(stream, fmt):
+    """Yield (line number, normalized record) from a JSONL or CSV text stream without loading it whole."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            images = row.get('images')
+            yield reader.line_num, {
+                'name': row.get('name'),
+                'description': row.get('description'),
+                'main_image_url': row.get('main_image_url') or None,
+                'images': images.split(IMAGE_SEPARATOR) if images else None
+            }
+    else:
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_number, None
+                continue
+            yield line_number, {
+                'name': row.get('name'),
+                'description': row.get('description'),
+                'main_image_url': row.get('main_image_url'),
+                'images': row.get('images')
+            }
+
+
+def validate(record):
+    if record is None:
+        raise InvalidRecord('not valid JSON')
+    if not record['name'] or not isinstance(record['name'], str):
+        raise InvalidRecord('name is required')
+    if record['description'] is None:
+        raise InvalidRecord('description is required')
+    images = record['images']
+    if images is not None and not (isinstance(images, list) and all(isinstance(key, str) for key in images)):
+        raise InvalidRecord('images must be a list of keys')
+    return record
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _dedupe(records):
+    # Later rows for the same name win, as they would if imported one at a time
+    return list({record['name']: record for record in records}.values())
+
+
+def import_batch(records, upsert=True):
+    """Insert (or update by name) one batch of plants and their images; returns (inserted, updated, images)."""
+    plants = Plant.__table__
+    images = PlantImage.__table__
+    if upsert:
+        records = _dedupe(records)
+
+    # Names aren't unique; a record updates the oldest plant with its name
+    existing = {}
+    if upsert:
+        rows = db.session.execute(
+            db.select(db.func.min(Plant.id), Plant.name)
+            .where(Plant.name.in_([record['name'] for record in records]))
+            .group_by(Plant.name)
+        )
+        existing = {name: plant_id for plant_id, name in rows}
+
+    updates = [record for record in records if record['name'] in existing]
+    inserts = [record for record in records if record['name'] not in existing]
+
+    if updates:
+        db.session.execute(
+            db.update(plants)
+            .where(plants.c.id == db.bindparam('b_id'))
+            .values(
+                description=db.bindparam('b_description'),
+                main_image_url=db.bindparam('b_main_image_url'),
+                # Variants of a replaced main image are stale; the next generate-variants run rebuilds them
+                main_image_variants=db.case(
+                    (plants.c.main_image_url == db.bindparam('b_main_image_url'), plants.c.main_image_variants),
+                    else_=db.null()
+                ),
+                version=plants.c.version + 1
+            ),
+            [
+                {
+                    'b_id': existing[record['name']],
+                    'b_description': record['description'],
+                    'b_main_image_url': record['main_image_url']
+                }
+                for record in updates
+            ]
+        )
+
+    inserted_ids = []
+    if inserts:
+        inserted_ids = db.session.scalars(
+            db.insert(plants).returning(plants.c.id, sort_by_parameter_order=True),
+            [
+                {'name': record['name'], 'description': record['description'], 'main_image_url': record['main_image_url']}
+                for record in inserts
+            ]
+        ).all()
+
+    # A record that lists images replaces the plant's images; one without an `images` field leaves them alone
+    replaced = [existing[record['name']] for record in updates if record['images'] is not None]
+    if replaced:
+        db.session.execute(db.delete(images).where(images.c.plant_id.in_(replaced)))
+
+    image_rows = [
+        {'plant_id': existing[record['name']], 'image_url': key}
+        for record in updates if record['images']
+        for key in record['images']
+    ] + [
+        {'plant_id': plant_id, 'image_url': key}
+        for record, plant_id in zip(inserts, inserted_ids) if record['images']
+        for key in record['images']
+    ]
+    if image_rows:
+        db.session.execute(db.insert(images), image_rows)
+
+    db.session.commit()
+    return len(inserts), len(updates), len(image_rows)
+
+
+STAGING_TABLE = 'plant_import_staging'
+
+
+def supports_copy():
+    return db.session.connection().dialect.driver == 'psycopg2'
+
+
+def copy_import_batch(records, upsert=True):
+    """Postgres variant of import_batch: COPY the batch into a temp table and upsert from there in SQL."""
+    if upsert:
+        records = _dedupe(records)
+
+    connection = db.session.connection()
+    connection.exec_driver_sql(
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} ("
+        "plant_id int, name text, description text, main_image_url text, images jsonb"
+        ") ON COMMIT DELETE ROWS"
+    )
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow([
+            record['name'],
+            record['description'],
+            record['main_image_url'],
+            json.dumps(record['images']) if record['images'] is not None else None
+        ])
+    buffer.seek(0)
+    # csv.writer leaves None and '' alike as an empty unquoted field, which COPY reads as NULL
+    # except in the columns that can't be NULL
+    connection.connection.driver_connection.cursor().copy_expert(
+        f"COPY {STAGING_TABLE} (name, description, main_image_url, images) FROM STDIN "
+        f"WITH (FORMAT csv, FORCE_NOT_NULL (name, description))",
+        buffer
+    )
+
+    updated = 0
+    if upsert:
+        connection.exec_driver_sql(
+            f"UPDATE {STAGING_TABLE} s SET plant_id = (SELECT min(p.id) FROM plants p WHERE p.name = s.name)"
+        )
+        updated = connection.exec_driver_sql(
+            f"UPDATE plants p SET description = s.description, main_image_url = s.main_image_url, "
+            f"main_image_variants = CASE WHEN p.main_image_url = s.main_image_url THEN p.main_image_variants END, "
+            f"version = p.version + 1 "
+            f"FROM {STAGING_TABLE} s WHERE p.id = s.plant_id"
+        ).rowcount
+        connection.exec_driver_sql(
+            f"DELETE FROM plant_images i USING {STAGING_TABLE} s "
+            f"WHERE s.images IS NOT NULL AND i.plant_id = s.plant_id"
+        )
+
+    # New plants get their ids up front so their images can be inserted from the staging table
+    connection.exec_driver_sql(
+        f"UPDATE {STAGING_TABLE} SET plant_id = nextval(pg_get_serial_sequence('plants', 'id')) "
+        f"WHERE plant_id IS NULL"
+    )
+    inserted = connection.exec_driver_sql(
+        f"INSERT INTO plants (id, name, description, main_image_url, likes_count, saves_count, comments_count, version) "
+        f"SELECT plant_id, name, description, main_image_url, 0, 0, 0, 1 FROM {STAGING_TABLE} s "
+        f"WHERE NOT EXISTS (SELECT 1 FROM plants p WHERE p.id = s.plant_id)"
+    ).rowcount
+    images = connection.exec_driver_sql(
+        f"INSERT INTO plant_images (plant_id, image_url) "
+        f"SELECT s.plant_id, image.key FROM {STAGING_TABLE} s, jsonb_array_elements_text(s.images) AS image(key)"
+    ).rowcount
+
+    db.session.commit()
+    return inserted, updated, images
+
+
+def export_rows(batch_size=1000):
+    """Yield plant records with their image keys, reading the catalog in id-ordered batches."""
+    plants = Plant.__table__
+    images = PlantImage.__table__
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(plants.c.id, plants.c.name, plants.c.description, plants.c.main_image_url)
+            .where(plants.c.id > last_id)
+            .order_by(plants.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+
+        keys = {}
+        for plant_id, key in db.session.execute(
+            db.select(images.c.plant_id, images.c.image_url)
+            .where(images.c.plant_id.in_([row.id for row in rows]))
+            .order_by(images.c.id)
+        ):
+            keys.setdefault(plant_id, []).append(key)
+
+        for row in rows:
+            yield {
+                'name': row.name,
+                'description': row.description,
+                'main_image_url': row.main_image_url,
+                'images': keys.get(row.id, [])
+            }
+        last_id = rows[-1].id
+
+
+def write_records(stream, fmt, records):
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(FIELDS)
+        for record in records:
+            writer.writerow([
+                record['name'],
+                record['description'],
+                record['main_image_url'] or '',
+                IMAGE_SEPARATOR.join(record['images'])
+            ])
+            count += 1
+    else:
+        for record in records:
+            stream.write(json.dumps(record, ensure_ascii=False))
+            stream.write('\n')
+            count += 1
+    return count
@@ -0,0 +1,245 @@
+import os
+import socket
+import time
+import click
+from flask.cli import AppGroup
+from app.catalog import (
+    InvalidRecord, batched, copy_import_batch, export_rows, import_batch, read_records, supports_copy, validate,
+    write_records
+)
+from app.extensions import db, response_cache, job_queue
+from app.images import store_variants
+from app.models.plant import Plant, PlantImage
+from app.models.base import utcnow
+from app.models.job import Job, DeadJob
+from app.models.upload import PendingUpload
+from app.query_plans import check_query_plans
+from app.rankings import refresh_rankings
+from app.s3_helper import download_s3_object, delete_s3_object
+
+plants_cli = AppGroup('plants', help='Plant catalog maintenance commands.')
+uploads_cli = AppGroup('uploads', help='Direct-to-storage upload maintenance commands.')
+ops_cli = AppGroup('ops', help='Operational checks.')
+jobs_cli = AppGroup('jobs', help='Background job queue commands.')
+
+
+@job_queue.task('plants.reconcile_counts')
+def reconcile_counts():
+    repaired = Plant.reconcile_counts()
+    if repaired:
+        response_cache.invalidate_all()
+    return repaired
+
+
+@plants_cli.command('reconcile-counts')
+@click.option('--enqueue', is_flag=True, help='Queue the repair for a job worker instead of running it here.')
+def reconcile_counts_command(enqueue):
+    """Recompute likes/saves/comments counters from the source tables."""
+    if enqueue:
+        job_queue.enqueue('plants.reconcile_counts')
+        click.echo('Queued counter reconciliation.')
+        return
+    repaired = reconcile_counts()
+    click.echo(f'Repaired counters on {repaired} plant(s).')
+
+
+@job_queue.task('plants.refresh_rankings')
+def refresh_rankings_job(full=False):
+    listed = refresh_rankings(full=full)
+    response_cache.bump('plants')
+    return listed
+
+
+@plants_cli.command('refresh-rankings')
+@click.option('--full', is_flag=True, help='Recompute trending scores from the whole trending window.')
+@click.option('--enqueue', is_flag=True, help='Queue the refresh for a job worker instead of running it here.')
+def refresh_rankings_command(full, enqueue):
+    """Rebuild the trending and most-liked lists behind `GET /plants?sort=`."""
+    if enqueue:
+        job_queue.enqueue('plants.refresh_rankings', full=full)
+        click.echo('Queued ranking refresh.')
+        return
+    listed = refresh_rankings_job(full=full)
+    click.echo(', '.join(f'{kind}: {count} plant(s)' for kind, count in listed.items()))
+
+
+@plants_cli.command('generate-variants')
+@click.option('--regenerate', is_flag=True, help='Also rebuild images that already have variants.')
+def generate_variants_command(regenerate):
+    """Render thumbnail/WebP variants for plant images uploaded outside the app."""
+    processed = 0
+    for model, key_column, variants_column in (
+        (Plant, Plant.main_image_url, Plant.main_image_variants),
+        (PlantImage, PlantImage.image_url, PlantImage.image_variants),
+    ):
+        query = db.select(model).where(key_column.is_not(None)).order_by(model.id).limit(100)
+        if not regenerate:
+            query = query.where(variants_column.is_(None))
+
+        # Id-ordered batches, so each commit happens between reads rather than under an open cursor
+        last_id = 0
+        while True:
+            rows = db.session.scalars(query.where(model.id > last_id)).all()
+            if not rows:
+                break
+            for row in rows:
+                key = getattr(row, key_column.key)
+                source = download_s3_object(key)
+                if source is None:
+                    continue
+                with source:
+                    setattr(row, variants_column.key, store_variants(source, key))
+                processed += 1
+            last_id = rows[-1].id
+            db.session.commit()
+
+    if processed:
+        response_cache.invalidate_all()
+    click.echo(f'Generated variants for {processed} image(s).')
+
+
+@uploads_cli.command('cleanup')
+@click.option('--grace', default=3600, show_default=True,
+              help='Seconds after a policy expires before its unconfirmed upload is removed.')
+def cleanup_uploads_command(grace):
+    """Delete objects and records for direct uploads that were never confirmed."""
+    removed = 0
+    for upload in db.session.scalars(PendingUpload.abandoned_query(grace)).all():
+        delete_s3_object(upload.key)
+        db.session.delete(upload)
+        removed += 1
+    db.session.commit()
+    click.echo(f'Removed {removed} abandoned upload(s).')
+
+
+def _open(path, mode='r'):
+    if path == '-':
+        return click.get_text_stream('stdin' if mode == 'r' else 'stdout', encoding='utf-8')
+    # csv needs newline='' to keep line breaks inside quoted descriptions intact
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def _format_for(path, fmt):
+    if fmt:
+        return fmt
+    return 'csv' if path.endswith('.csv') else 'jsonl'
+
+
+def _report(label, count, started):
+    elapsed = time.monotonic() - started
+    rate = count / elapsed if elapsed else 0
+    click.echo(f'{label} {count} plant(s) in {elapsed:.1f}s ({rate:.0f}/s)', err=True)
+
+
+@plants_cli.command('import')
+@click.argument('path', type=click.Path(allow_dash=True))
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']),
+              help='Input format; defaults to the file extension, jsonl for stdin.')
+@click.option('--batch-size', default=1000, show_default=True, help='Plants written per transaction.')
+@click.option('--upsert/--no-upsert', default=True, show_default=True,
+              help='Update plants that already exist with the same name instead of adding duplicates.')
+@click.option('--copy/--no-copy', 'use_copy', default=None,
+              help='Load batches through COPY; defaults to on when the database is Postgres.')
+def import_plants_command(path, fmt, batch_size, upsert, use_copy):
+    """Stream plants and their image keys from JSONL or CSV into the catalog."""
+    fmt = _format_for(path, fmt)
+    if use_copy is None:
+        use_copy = supports_copy()
+    write_batch = copy_import_batch if use_copy else import_batch
+
+    def valid_records(records):
+        for line_number, record in records:
+            try:
+                yield validate(record)
+            except InvalidRecord as e:
+                totals['skipped'] += 1
+                click.echo(f'Skipping line {line_number}: {e}', err=True)
+
+    totals = {'inserted': 0, 'updated': 0, 'images': 0, 'skipped': 0}
+    started = time.monotonic()
+    with _open(path) as stream:
+        for batch in batched(valid_records(read_records(stream, fmt)), batch_size):
+            inserted, updated, images = write_batch(batch, upsert=upsert)
+            totals['inserted'] += inserted
+            totals['updated'] += updated
+            totals['images'] += images
+            _report('Imported', totals['inserted'] + totals['updated'], started)
+
+    if totals['inserted'] or totals['updated']:
+        response_cache.invalidate_all()
+    click.echo(
+        f"Inserted {totals['inserted']}, updated {totals['updated']}, skipped {totals['skipped']} plant(s); "
+        f"wrote {totals['images']} image(s)."
+    )
+
+
+@plants_cli.command('export')
+@click.argument('path', type=click.Path(allow_dash=True))
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']),
+              help='Output format; defaults to the file extension, jsonl for stdout.')
+@click.option('--batch-size', default=1000, show_default=True, help='Plants read per query.')
+def export_plants_command(path, fmt, batch_size):
+    """Stream the catalog, with image keys, to JSONL or CSV in the format `import` reads."""
+    fmt = _format_for(path, fmt)
+    started = time.monotonic()
+    with _open(path, 'w') as stream:
+        count = write_records(stream, fmt, export_rows(batch_size))
+    _report('Exported', count, started)
+
+
+@ops_cli.command('check-indexes')
+@click.option('--plant-id', default=1, show_default=True, help='Plant id to plug into the sample queries.')
+@click.option('--user-id', default=1, show_default=True, help='User id to plug into the sample queries.')
+def check_indexes_command(plant_id, user_id):
+    """EXPLAIN the hot queries and fail if any of them scans a whole table."""
+    failures = 0
+    for label, scanned in check_query_plans(plant_id, user_id):
+        if scanned:
+            failures += 1
+            click.echo(f'WARNING {label}: sequential scan on {", ".join(scanned)}', err=True)
+        else:
+            click.echo(f'ok      {label}')
+    if failures:
+        raise click.ClickException(f'{failures} hot query(ies) fall back to a sequential scan.')
+
+
+@jobs_cli.command('work')
+@click.option('--once', is_flag=True, help='Exit when no job is due instead of polling.')
+@click.option('--poll-interval', default=1.0, show_default=True, help='Seconds to sleep when the queue is empty.')
+def work_command(once, poll_interval):
+    """Run jobs from the jobs table (JOBS_BACKEND=database)."""
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    processed = 0
+    while True:
+        if job_queue.work_once(worker_id):
+            processed += 1
+        elif once:
+            break
+        else:
+            time.sleep(poll_interval)
+    click.echo(f'Processed {processed} job(s).')
+
+
+@jobs_cli.command('status')
+def status_command():
+    """Show queued and dead-lettered job counts by name."""
+    for label, model in (('queued', Job), ('dead', DeadJob)):
+        rows = db.session.execute(db.select(model.name, db.func.count()).group_by(model.name).order_by(model.name))
+        for name, count in rows:
+            click.echo(f'{label:<7} {name:<30} {count}')
+
+
+@jobs_cli.command('requeue-dead')
+@click.option('--name', help='Only requeue dead jobs with this name.')
+def requeue_dead_command(name):
+    """Move dead-lettered jobs back onto the queue with a fresh set of attempts."""
+    query = db.select(DeadJob)
+    if name:
+        query = query.where(DeadJob.name == name)
+    requeued = 0
+    for dead in db.session.scalars(query).all():
+        db.session.add(Job(name=dead.name, payload=dead.payload, max_attempts=job_queue.max_attempts, run_at=utcnow()))
+        db.session.delete(dead)
+        requeued += 1
+    db.session.commit()
+    click.echo(f'Requeued {requeued} job(s).')
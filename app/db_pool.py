@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+from sqlalchemy.pool import QueuePool, NullPool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection and how often they give up."""
+
+    slow_checkout_warning = 0.1
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.slow_checkout_warning = self.slow_checkout_warning
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._metrics_lock:
+                self.timeouts += 1
+            logger.warning("Connection pool exhausted: %s", pool_stats(self))
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._metrics_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            if waited >= self.slow_checkout_warning:
+                logger.warning("Waited %.0fms for a database connection: %s", waited * 1000, pool_stats(self))
+
+
+def engine_options(config):
+    uri = config.get('SQLALCHEMY_DATABASE_URI') or ''
+    if not uri.startswith('postgresql'):
+        return {}
+
+    if config['DB_PGBOUNCER']:
+        # PgBouncer does the pooling (transaction mode); keeping our own pool would pin its server connections.
+        return {'poolclass': NullPool}
+
+    TimedQueuePool.slow_checkout_warning = config['DB_POOL_WAIT_WARNING_MS'] / 1000
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'connect_args': connect_args(config)
+    }
+
+
+def connect_args(config):
+    args = {'connect_timeout': config['DB_CONNECT_TIMEOUT']}
+    # Sent with the connection startup, so it costs no extra round trip. Only the web process is capped;
+    # migrations, `flask` commands and `flask jobs work` use their own connections and may run long.
+    if config['DB_STATEMENT_TIMEOUT_MS'] and config['APP_PROCESS'] == 'web':
+        args['options'] = f"-c statement_timeout={int(config['DB_STATEMENT_TIMEOUT_MS'])}"
+    return args
+
+
+def pool_stats(pool):
+    stats = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow
+        })
+    if isinstance(pool, TimedQueuePool):
+        with pool._metrics_lock:
+            stats.update({
+                'checkouts': pool.checkouts,
+                'timeouts': pool.timeouts,
+                'wait_avg_ms': round(pool.wait_total / pool.checkouts * 1000, 2) if pool.checkouts else 0.0,
+                'wait_max_ms': round(pool.wait_max * 1000, 2)
+            })
+    return stats
@@ -3,11 +3,28 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
+from app.cache import ResponseCache
+from app.instrumentation import Instrumentation
+from app.jobs import JobQueue
+from app.passwords import PasswordHasher
+from app.replicas import RoutingSession, ReplicaRouter
+from app.toggles import ToggleBuffer
 
-db = SQLAlchemy()
-migrate = Migrate()
+def include_object(object, name, type_, reflected, compare_to):
+    # Indexes that only exist on one dialect (ddl_if) shouldn't show up as missing on the others
+    dialect = object.info.get('dialect') if hasattr(object, 'info') else None
+    return dialect is None or dialect == db.engine.dialect.name
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+migrate = Migrate(include_object=include_object)
 bcrypt = Bcrypt()
 jwt = JWTManager()
+response_cache = ResponseCache()
+password_hasher = PasswordHasher()
+replica_router = ReplicaRouter()
+instrumentation = Instrumentation()
+job_queue = JobQueue()
+toggle_buffer = ToggleBuffer()
 
 @jwt.invalid_token_loader
 def invalid_token_loader(reason):
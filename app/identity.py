@@ -0,0 +1,50 @@
+from collections import namedtuple
+from flask import g, current_app
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
+from app.cache import LocalCache
+from app.extensions import db
+from app.models.user import User
+
+Identity = namedtuple('Identity', ['id', 'username'])
+
+USERNAME_CLAIM = 'username'
+
+_identities = LocalCache(maxsize=10000)
+
+
+def identity_claims(user):
+    return {USERNAME_CLAIM: user.username}
+
+
+def get_current_user():
+    """The caller's (id, username), resolved at most once per request and cached across requests.
+
+    With IDENTITY_FROM_JWT_CLAIMS enabled the username is taken from the token itself,
+    so no query is made at all.
+    """
+    if 'current_identity' in g:
+        return g.current_identity
+
+    verify_jwt_in_request(optional=True)
+    subject = get_jwt_identity()
+    identity = None
+    if subject:
+        user_id = int(subject)
+        claims = get_jwt()
+        if current_app.config['IDENTITY_FROM_JWT_CLAIMS'] and USERNAME_CLAIM in claims:
+            identity = Identity(user_id, claims[USERNAME_CLAIM])
+        else:
+            identity = _identities.get(user_id)
+            if identity is None:
+                row = db.session.execute(db.select(User.id, User.username).where(User.id == user_id)).first()
+                if row:
+                    identity = Identity(*row)
+                    _identities.set(user_id, identity, current_app.config['IDENTITY_CACHE_TTL'])
+
+    g.current_identity = identity
+    return identity
+
+
+def invalidate_identity(user_id):
+    _identities.delete(int(user_id))
+    g.pop('current_identity', None)
@@ -0,0 +1,53 @@
+import io
+from .s3_helper import generate_s3_url, upload_stream_to_s3
+
+# Longest edge in pixels; thumbnails back listing tiles, medium backs detail views
+VARIANT_SIZES = {
+    'thumb': 200,
+    'medium': 800,
+}
+VARIANT_FORMAT = 'WEBP'
+VARIANT_CONTENT_TYPE = 'image/webp'
+VARIANT_QUALITY = 80
+
+
+def variant_key(key, name):
+    return f"variants/{name}/{key}.webp"
+
+
+def render_variants(source):
+    """Decode `source` once and return {variant name: encoded bytes}, or {} if it isn't an image."""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(source) as original:
+            image = ImageOps.exif_transpose(original)
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+            rendered = {}
+            for name, size in VARIANT_SIZES.items():
+                variant = image.copy()
+                variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+                buffer = io.BytesIO()
+                variant.save(buffer, VARIANT_FORMAT, quality=VARIANT_QUALITY, method=4)
+                rendered[name] = buffer.getvalue()
+            return rendered
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        print(f"Error rendering image variants: {e}")
+        return {}
+
+
+def store_variants(source, key):
+    """Render and upload every variant of `key`; returns {variant name: object key} for those stored."""
+    stored = {}
+    for name, data in render_variants(source).items():
+        uploaded = upload_stream_to_s3(io.BytesIO(data), VARIANT_CONTENT_TYPE, key=variant_key(key, name))
+        if uploaded:
+            stored[name] = uploaded
+    return stored
+
+
+def image_url(key, variants=None, variant=None):
+    # Falls back to the original when the variant hasn't been generated (yet)
+    if not key:
+        return None
+    return generate_s3_url((variants or {}).get(variant) or key)
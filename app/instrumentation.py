@@ -0,0 +1,130 @@
+from collections import defaultdict
+import logging
+import threading
+import time
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('app.sql')
+
+# Per-request counters; each is also summed per endpoint for /ops/metrics
+COUNTERS = ('queries', 'db_seconds', 'slow_queries', 's3_presigns', 'serialize_seconds')
+
+
+def record(name, value=1):
+    """Add to a counter for the current request; a no-op outside requests (CLI, background threads)."""
+    if has_request_context():
+        metrics = g.get('request_metrics')
+        if metrics is not None:
+            metrics[name] += value
+
+
+class Instrumentation:
+    """Counts SQL statements, DB time, S3 presigns and JSON encoding time per request.
+
+    Totals go out as a Server-Timing header (when SERVER_TIMING_ENABLED) and are summed
+    per endpoint in this process for the Prometheus text endpoint.
+    """
+
+    def __init__(self, app=None):
+        self.server_timing = False
+        self.slow_query_seconds = 0.2
+        self._lock = threading.Lock()
+        self._totals = defaultdict(lambda: defaultdict(float))
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.server_timing = app.config.get('SERVER_TIMING_ENABLED', False)
+        self.slow_query_seconds = app.config.get('SLOW_QUERY_MS', 200) / 1000
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        if not self._listening:
+            # Listening on the Engine class covers the primary and any replica engines
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._listening = True
+        app.extensions['instrumentation'] = self
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        record('queries')
+        record('db_seconds', elapsed)
+        if elapsed >= self.slow_query_seconds:
+            record('slow_queries')
+            route = request.endpoint if has_request_context() else None
+            logger.warning("Slow query (%.0fms) on %s: %s", elapsed * 1000, route or 'no request', statement)
+
+    def _start_request(self):
+        g.request_metrics = defaultdict(float)
+        g.request_started = time.perf_counter()
+
+    def _finish_request(self, response):
+        metrics = g.pop('request_metrics', None)
+        if metrics is None:
+            return response
+        elapsed = time.perf_counter() - g.pop('request_started')
+
+        key = (request.endpoint or 'unmatched', request.method, response.status_code)
+        with self._lock:
+            totals = self._totals[key]
+            totals['requests'] += 1
+            totals['seconds'] += elapsed
+            for name in COUNTERS:
+                totals[name] += metrics[name]
+
+        if self.server_timing:
+            response.headers['Server-Timing'] = ', '.join([
+                f'db;dur={metrics["db_seconds"] * 1000:.1f};desc="{int(metrics["queries"])} queries"',
+                f's3;desc="{int(metrics["s3_presigns"])} presigns"',
+                f'json;dur={metrics["serialize_seconds"] * 1000:.2f}',
+                f'total;dur={elapsed * 1000:.1f}'
+            ])
+        return response
+
+    def snapshot(self):
+        with self._lock:
+            return {key: dict(totals) for key, totals in self._totals.items()}
+
+
+METRIC_HELP = {
+    'requests': ('app_requests_total', 'Requests handled by this process'),
+    'seconds': ('app_request_seconds_total', 'Time spent handling requests'),
+    'queries': ('app_db_queries_total', 'SQL statements executed'),
+    'db_seconds': ('app_db_seconds_total', 'Time spent executing SQL statements'),
+    'slow_queries': ('app_db_slow_queries_total', 'SQL statements slower than SLOW_QUERY_MS'),
+    's3_presigns': ('app_s3_presigns_total', 'Presigned URLs generated (cache misses)'),
+    'serialize_seconds': ('app_json_seconds_total', 'Time spent encoding JSON responses'),
+}
+
+
+def render_prometheus(snapshot, gauges=()):
+    """Prometheus text exposition of per-endpoint totals plus (name, help, labels, value) gauges."""
+    lines = []
+    for field, (name, help_text) in METRIC_HELP.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for (endpoint, method, status), totals in sorted(snapshot.items()):
+            lines.append(
+                f'{name}{{endpoint="{endpoint}",method="{method}",status="{status}"}} {_number(totals.get(field, 0))}'
+            )
+
+    seen = set()
+    for name, help_text, labels, value in gauges:
+        if name not in seen:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            seen.add(name)
+        label_text = ','.join(f'{key}="{label}"' for key, label in labels.items())
+        lines.append(f'{name}{{{label_text}}} {_number(value)}' if label_text else f'{name} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
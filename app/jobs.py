@@ -0,0 +1,174 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import json
+import threading
+from flask import current_app, has_app_context
+from app.models.base import utcnow
+
+Task = namedtuple('Task', ['fn', 'on_dead'])
+
+
+class JobQueue:
+    """Runs named tasks after the request: on threads in this process (`thread` backend) or from
+    the jobs table via `flask jobs work` (`database` backend).
+
+    Failed runs are retried with exponential backoff; after JOB_MAX_ATTEMPTS the job is written
+    to dead_jobs and its `on_dead` hook runs. Database payloads must be JSON. `local=True` jobs
+    always run in this process, for inputs such as spooled uploads that can't leave it.
+    """
+
+    def __init__(self, app=None):
+        self.backend = 'thread'
+        self.workers = 4
+        self.max_attempts = 5
+        self.backoff = 2
+        self.lock_timeout = 600
+        self.tasks = {}
+        self._app = None
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = app.config.get('JOBS_BACKEND', 'thread')
+        self.workers = app.config.get('JOB_WORKERS', 4)
+        self.max_attempts = app.config.get('JOB_MAX_ATTEMPTS', 5)
+        self.backoff = app.config.get('JOB_BACKOFF_SECONDS', 2)
+        self.lock_timeout = app.config.get('JOB_LOCK_TIMEOUT', 600)
+        self._app = app
+        self._executor = None
+        app.extensions['job_queue'] = self
+
+    def task(self, name, on_dead=None):
+        def decorator(fn):
+            self.tasks[name] = Task(fn, on_dead)
+            return fn
+        return decorator
+
+    def enqueue(self, name, local=False, **payload):
+        if name not in self.tasks:
+            raise KeyError(f"Unknown job {name}")
+        if local or self.backend == 'thread':
+            app = current_app._get_current_object() if has_app_context() else self._app
+            self._submit(app, name, payload, attempt=1)
+            return
+
+        from app.extensions import db
+        from app.models.job import Job
+
+        db.session.add(Job(name=name, payload=payload, max_attempts=self.max_attempts, run_at=utcnow()))
+        db.session.commit()
+
+    def backoff_for(self, attempt):
+        return self.backoff * 2 ** (attempt - 1)
+
+    def run(self, name, payload):
+        self.tasks[name].fn(**payload)
+
+    def bury(self, name, payload, attempts, error):
+        from app.extensions import db
+        from app.models.job import DeadJob
+
+        print(f"Job {name} failed after {attempts} attempt(s): {error!r}")
+        on_dead = self.tasks[name].on_dead
+        if on_dead is not None:
+            try:
+                on_dead(**payload)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Dead-letter hook for {name} failed: {e!r}")
+        db.session.add(DeadJob(name=name, payload=_json_safe(payload), attempts=attempts, last_error=repr(error)))
+        db.session.commit()
+
+    # Thread backend
+
+    def _get_executor(self):
+        # Created lazily so each forked worker process gets its own threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+            return self._executor
+
+    def _submit(self, app, name, payload, attempt, delay=0):
+        if delay:
+            timer = threading.Timer(delay, self._submit, (app, name, payload, attempt))
+            timer.daemon = True
+            timer.start()
+            return
+        self._get_executor().submit(self._run_local, app, name, payload, attempt)
+
+    def _run_local(self, app, name, payload, attempt):
+        from app.extensions import db
+
+        with app.app_context():
+            try:
+                self.run(name, payload)
+            except Exception as error:
+                db.session.rollback()
+                if attempt >= self.max_attempts:
+                    self.bury(name, payload, attempt, error)
+                else:
+                    print(f"Job {name} attempt {attempt} failed, retrying: {error!r}")
+                    self._submit(app, name, payload, attempt + 1, delay=self.backoff_for(attempt))
+
+    # Database backend
+
+    def claim(self, worker_id):
+        from app.extensions import db
+        from app.models.job import Job
+
+        job = db.session.scalars(Job.due_query(self.lock_timeout)).first()
+        if job is None:
+            db.session.rollback()
+            return None
+        job.locked_at = utcnow()
+        job.locked_by = worker_id
+        job.attempts += 1
+        db.session.commit()
+        return job
+
+    def work_once(self, worker_id):
+        """Run one due job from the jobs table; returns False when there was nothing to do."""
+        from app.extensions import db
+        from app.models.job import Job
+
+        job = self.claim(worker_id)
+        if job is None:
+            return False
+
+        job_id, name, payload, attempts = job.id, job.name, job.payload, job.attempts
+        try:
+            self.run(name, payload)
+        except Exception as error:
+            db.session.rollback()
+            job = db.session.get(Job, job_id)
+            if attempts >= job.max_attempts:
+                self.bury(name, payload, attempts, error)
+                db.session.execute(db.delete(Job).where(Job.id == job_id))
+                db.session.commit()
+            else:
+                print(f"Job {name} attempt {attempts} failed, retrying: {error!r}")
+                job.run_at = utcnow() + timedelta(seconds=self.backoff_for(attempts))
+                job.locked_at = None
+                job.locked_by = None
+                job.last_error = repr(error)
+                db.session.commit()
+        else:
+            db.session.execute(db.delete(Job).where(Job.id == job_id))
+            db.session.commit()
+        return True
+
+
+def _json_safe(payload):
+    # Local jobs may carry file objects; the dead-letter row keeps a description of them instead
+    return {key: value if _is_json(value) else repr(value) for key, value in payload.items()}
+
+
+def _is_json(value):
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return False
+    return True
@@ -0,0 +1,68 @@
+from datetime import date, datetime
+from decimal import Decimal
+import time
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+from app.instrumentation import record
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    """Serializes with orjson: compact output, datetimes as ISO 8601 to the second, no key sorting."""
+
+    options = (orjson.OPT_OMIT_MICROSECONDS | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self.options).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Skip the str round trip dumps() would add; orjson already produces UTF-8 bytes
+        obj = self._prepare_response_obj(args, kwargs)
+        started = time.perf_counter()
+        body = orjson.dumps(obj, default=_default, option=self.options)
+        record('serialize_seconds', time.perf_counter() - started)
+        return self._app.response_class(body, mimetype='application/json')
+
+
+class StdlibProvider(DefaultJSONProvider):
+    """Fallback with the same output conventions as OrjsonProvider."""
+
+    compact = True
+    sort_keys = False
+
+    @staticmethod
+    def default(value):
+        if isinstance(value, datetime):
+            return value.isoformat(timespec='seconds')
+        if isinstance(value, date):
+            return value.isoformat()
+        return DefaultJSONProvider.default(value)
+
+    def response(self, *args, **kwargs):
+        started = time.perf_counter()
+        response = super().response(*args, **kwargs)
+        record('serialize_seconds', time.perf_counter() - started)
+        return response
+
+
+def make_json_provider(app):
+    choice = app.config.get('JSON_PROVIDER', 'auto')
+    if choice == 'orjson' or (choice == 'auto' and orjson is not None):
+        if orjson is None:
+            raise RuntimeError("JSON_PROVIDER is orjson but orjson is not installed.")
+        return OrjsonProvider(app)
+    return StdlibProvider(app)
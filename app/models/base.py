@@ -1,5 +1,38 @@
+from datetime import datetime, timezone
+from sqlalchemy import DateTime
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.sql.functions import FunctionElement
 
 
 class Base(DeclarativeBase):
-    pass
\ No newline at end of file
+    pass
+
+
+def utcnow():
+    # Naive UTC, matching how the timestamp columns are stored
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class utc_timestamp(FunctionElement):
+    """The database's current time as naive UTC, for rows whose timestamps are compared with each other."""
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utc_timestamp)
+def _utc_timestamp(element, compiler, **kw):
+    return 'CURRENT_TIMESTAMP'
+
+
+@compiles(utc_timestamp, 'postgresql')
+def _utc_timestamp_postgresql(element, compiler, **kw):
+    # CURRENT_TIMESTAMP would be stored in the session's TimeZone
+    return "(now() AT TIME ZONE 'utc')"
+
+
+@compiles(utc_timestamp, 'sqlite')
+def _utc_timestamp_sqlite(element, compiler, **kw):
+    # Same text format SQLAlchemy binds datetimes with, so stored and bound values compare correctly
+    return "(strftime('%Y-%m-%d %H:%M:%f000', 'now'))"
@@ -1,18 +1,28 @@
 from app.extensions import db
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, joinedload
 from sqlalchemy import ForeignKey
 from datetime import datetime
-from app.s3_helper import generate_s3_url
+from app.images import image_url
+from app.models.base import utc_timestamp
 
 class Comment(db.Model):
     __tablename__ = 'comments'
+    __table_args__ = (
+        db.Index('ix_comments_plant_id_created_at_id', 'plant_id', 'created_at', 'id'),
+    )
+
+    IMAGE_PENDING = 'pending'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     content: Mapped[str]
-    created_at: Mapped[datetime] = mapped_column(default=db.func.current_timestamp())
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    created_at: Mapped[datetime] = mapped_column(default=utc_timestamp(), index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), index=True)
     plant_id: Mapped[int] = mapped_column(ForeignKey('plants.id'))
     image_key = db.Column(db.String(255), nullable=True)
+    image_status = db.Column(db.String(16), nullable=True)
+    image_variants = db.Column(db.JSON, nullable=True)
 
     user: Mapped["User"] = relationship(back_populates="comments")
     plant: Mapped["Plant"] = relationship(back_populates="comments")
@@ -23,15 +33,43 @@ class Comment(db.Model):
             'plant_id': self.plant_id,
             'username': self.user.username,
             'content': self.content,
-            'image_url': generate_s3_url(self.image_key) if self.image_key else None,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
+            'image_url': image_url(self.image_key, self.image_variants, 'medium') if self.image_ready else None,
+            'thumbnail_url': image_url(self.image_key, self.image_variants, 'thumb') if self.image_ready else None,
+            'image_status': self.image_status if self.image_key else None,
+            'created_at': self.created_at
         }
 
+    @property
+    def image_ready(self):
+        # Rows from before uploads could be deferred have a key but no status
+        return bool(self.image_key) and self.image_status in (None, self.IMAGE_READY)
+
+    @classmethod
+    def feed_query(cls, plant_id):
+        # Newest first, with the author joined in so to_dict doesn't lazy-load it per row
+        return (
+            db.select(cls)
+            .where(cls.plant_id == plant_id)
+            .options(joinedload(cls.user))
+            .order_by(cls.created_at.desc(), cls.id.desc())
+        )
+
+    @classmethod
+    def feed_query_after(cls, plant_id, after=None):
+        query = cls.feed_query(plant_id)
+        if after:
+            query = query.where(db.tuple_(cls.created_at, cls.id) < after)
+        return query
+
+    def cursor_key(self):
+        return self.created_at, self.id
+
     @classmethod
     def from_dict(cls, comment_data):
         return cls(
             content=comment_data["content"],
             user_id=comment_data["user_id"],
             plant_id=comment_data["plant_id"],
-            image_key=comment_data["image_key"]
+            image_key=comment_data["image_key"],
+            image_status=comment_data.get("image_status")
         )
@@ -0,0 +1,44 @@
+from app.extensions import db
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime, timedelta
+from typing import Optional
+from .base import utcnow
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(db.String(100))
+    payload: Mapped[dict] = mapped_column(db.JSON)
+    attempts: Mapped[int] = mapped_column(default=0, server_default='0')
+    max_attempts: Mapped[int]
+    run_at: Mapped[datetime] = mapped_column(index=True)
+    locked_at: Mapped[Optional[datetime]]
+    locked_by: Mapped[Optional[str]] = mapped_column(db.String(100))
+    last_error: Mapped[Optional[str]] = mapped_column(db.Text)
+    created_at: Mapped[datetime] = mapped_column(default=db.func.current_timestamp())
+
+    @classmethod
+    def due_query(cls, lock_timeout):
+        # Locks older than lock_timeout belong to a worker that died mid-job
+        now = utcnow()
+        return (
+            db.select(cls)
+            .where(cls.run_at <= now)
+            .where(db.or_(cls.locked_at.is_(None), cls.locked_at < now - timedelta(seconds=lock_timeout)))
+            .order_by(cls.run_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+
+
+class DeadJob(db.Model):
+    __tablename__ = 'dead_jobs'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(db.String(100))
+    payload: Mapped[dict] = mapped_column(db.JSON)
+    attempts: Mapped[int]
+    last_error: Mapped[Optional[str]] = mapped_column(db.Text)
+    failed_at: Mapped[datetime] = mapped_column(default=db.func.current_timestamp())
+
@@ -1,47 +1,185 @@
-from app.extensions import db
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.extensions import db, toggle_buffer
+from sqlalchemy.orm import Mapped, mapped_column, relationship, selectinload
 from sqlalchemy import ForeignKey
 from .relationships import user_plant_likes, user_plant_mylist
 from typing import List, Optional
-from ..s3_helper import generate_s3_url
+from ..images import image_url
 
 class Plant(db.Model):
     __tablename__ = 'plants'
+    __table_args__ = (
+        db.Index(
+            'ix_plants_search_document',
+            db.text("to_tsvector('english', name || ' ' || description)"),
+            postgresql_using='gin',
+            info={'dialect': 'postgresql'}
+        ).ddl_if(dialect='postgresql'),
+        db.Index(
+            'ix_plants_name_trgm',
+            'name',
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'},
+            info={'dialect': 'postgresql'}
+        ).ddl_if(dialect='postgresql'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str]
     description: Mapped[str]
     main_image_url: Mapped[Optional[str]]
+    main_image_variants: Mapped[Optional[dict]] = mapped_column(db.JSON)
+    likes_count: Mapped[int] = mapped_column(default=0, server_default='0')
+    saves_count: Mapped[int] = mapped_column(default=0, server_default='0')
+    comments_count: Mapped[int] = mapped_column(default=0, server_default='0')
+    version: Mapped[int] = mapped_column(default=1, server_default='1')
+    # Log of the time-decayed like/comment activity; see app/rankings.py
+    trending_score: Mapped[Optional[float]]
 
     liked_by = db.relationship('User', secondary='user_plant_likes', back_populates='liked_plants', lazy='dynamic')
     saved_by_users = db.relationship('User', secondary=user_plant_mylist, back_populates='saved_plants', lazy='dynamic')
     images: Mapped[List["PlantImage"]] = relationship(back_populates="plant", cascade="all, delete-orphan")
     comments: Mapped[List["Comment"]] = relationship(back_populates="plant", cascade="all, delete-orphan")
 
-    def to_list_dict(self, current_user=None):
+    def to_list_dict(self, current_user=None, is_liked=None):
+        if is_liked is None:
+            is_liked = self.id in self.liked_ids_for([self.id], current_user)
         return {
             'id': self.id,
             'name': self.name,
-            'main_image_url': generate_s3_url(self.main_image_url) if self.main_image_url else None,
-            'likes_count': self.liked_by.count(),
-            'is_liked': current_user in self.liked_by if current_user else False,
+            'main_image_url': image_url(self.main_image_url, self.main_image_variants, 'thumb'),
+            'likes_count': self.likes_count,
+            'is_liked': is_liked,
         }
 
-    def to_detail_dict(self, current_user=None):
-        main_image = {'id': 0, 'image_url': generate_s3_url(self.main_image_url)} if self.main_image_url else None
+    @classmethod
+    def to_list_dicts(cls, plants, current_user=None):
+        # One query for the caller's likes across the page instead of a membership scan per plant
+        liked_ids = cls.liked_ids_for([plant.id for plant in plants], current_user)
+        return [plant.to_list_dict(is_liked=plant.id in liked_ids) for plant in plants]
+
+    @staticmethod
+    def linked_ids_for(table, plant_ids, current_user=None):
+        if not plant_ids or not current_user:
+            return set()
+
+        linked_query = db.select(table.c.plant_id).where(
+            table.c.user_id == current_user.id,
+            table.c.plant_id.in_(plant_ids)
+        )
+        linked_ids = set(db.session.scalars(linked_query))
+        if toggle_buffer.enabled:
+            return toggle_buffer.overlay(table, current_user.id, plant_ids, linked_ids)
+        return linked_ids
+
+    @classmethod
+    def liked_ids_for(cls, plant_ids, current_user=None):
+        return cls.linked_ids_for(user_plant_likes, plant_ids, current_user)
+
+    @classmethod
+    def saved_ids_for(cls, plant_ids, current_user=None):
+        return cls.linked_ids_for(user_plant_mylist, plant_ids, current_user)
+
+    @classmethod
+    def adjust_counts(cls, plant_id, **deltas):
+        # Atomic in-place increment so concurrent writers never lose an update
+        values = {name: getattr(cls, name) + delta for name, delta in deltas.items()}
+        values['version'] = cls.version + 1
+        query = (
+            db.update(cls)
+            .where(cls.id == plant_id)
+            .values(**values)
+            .returning(*(getattr(cls, name) for name in deltas))
+        )
+        return db.session.execute(query).one()
+
+    @classmethod
+    def touch(cls, plant_id):
+        # Bumps the version alone, for changes that don't move any counter
+        db.session.execute(db.update(cls).where(cls.id == plant_id).values(version=cls.version + 1))
+
+    @classmethod
+    def batch_query(cls, plant_ids, with_images=False):
+        # Images come from one extra IN query rather than a lazy load per plant
+        query = db.select(cls).where(cls.id.in_(plant_ids))
+        if with_images:
+            query = query.options(selectinload(cls.images))
+        return query
+
+    @classmethod
+    def version_of(cls, plant_id):
+        return db.session.scalar(db.select(cls.version).where(cls.id == plant_id))
+
+    @classmethod
+    def reconcile_counts(cls):
+        from .comment import Comment
+
+        likes = (
+            db.select(db.func.count())
+            .where(user_plant_likes.c.plant_id == cls.id)
+            .scalar_subquery()
+        )
+        saves = (
+            db.select(db.func.count())
+            .where(user_plant_mylist.c.plant_id == cls.id)
+            .scalar_subquery()
+        )
+        comments = (
+            db.select(db.func.count())
+            .where(Comment.plant_id == cls.id)
+            .scalar_subquery()
+        )
+        query = (
+            db.update(cls)
+            .where(db.or_(
+                cls.likes_count != likes,
+                cls.saves_count != saves,
+                cls.comments_count != comments
+            ))
+            .values(likes_count=likes, saves_count=saves, comments_count=comments, version=cls.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        result = db.session.execute(query)
+        db.session.commit()
+        return result.rowcount
+
+    def to_detail_dict(self, current_user=None, comments=None, comments_next_cursor=None, is_liked=None, is_saved=None):
+        if is_liked is None:
+            is_liked = self.id in self.liked_ids_for([self.id], current_user)
+        if is_saved is None:
+            is_saved = self.id in self.saved_ids_for([self.id], current_user)
+        main_image = {
+            'id': 0,
+            'image_url': image_url(self.main_image_url, self.main_image_variants, 'medium'),
+            'thumbnail_url': image_url(self.main_image_url, self.main_image_variants, 'thumb')
+        } if self.main_image_url else None
         all_images = [main_image] + [image.to_dict() for image in self.images] if main_image else self.images
         all_images.sort(key=lambda img: img['id'])
-        return {
+        detail = {
             'id': self.id,
             'name': self.name,
             'description': self.description,
-            'likes_count': self.liked_by.count(),
-            'saves_count': self.saved_by_users.count(),
-            'is_liked': current_user in self.liked_by if current_user else False,
-            'is_saved': current_user in self.saved_by_users if current_user else False,
+            'likes_count': self.likes_count,
+            'saves_count': self.saves_count,
+            'is_liked': is_liked,
+            'is_saved': is_saved,
             'images': [img for img in all_images if img is not None],
-            'comments': [comment.to_dict() for comment in self.comments]
+            'comments_count': self.comments_count,
         }
+        # Batch responses leave the comment feed to GET /plants/<id>/comments
+        if comments is not None:
+            detail['comments'] = [comment.to_dict() for comment in comments]
+            detail['comments_next_cursor'] = comments_next_cursor
+        return detail
+
+    @classmethod
+    def to_detail_dicts(cls, plants, current_user=None):
+        plant_ids = [plant.id for plant in plants]
+        liked_ids = cls.liked_ids_for(plant_ids, current_user)
+        saved_ids = cls.saved_ids_for(plant_ids, current_user)
+        return [
+            plant.to_detail_dict(is_liked=plant.id in liked_ids, is_saved=plant.id in saved_ids)
+            for plant in plants
+        ]
 
     @classmethod
     def from_dict(cls, plant_data):
@@ -55,8 +193,9 @@ class PlantImage(db.Model):
     __tablename__ = 'plant_images'
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    plant_id: Mapped[int] = mapped_column(ForeignKey('plants.id'))
+    plant_id: Mapped[int] = mapped_column(ForeignKey('plants.id'), index=True)
     image_url: Mapped[str]
+    image_variants: Mapped[Optional[dict]] = mapped_column(db.JSON)
 
     plant: Mapped["Plant"] = relationship(back_populates="images")
 
@@ -64,7 +203,8 @@ class PlantImage(db.Model):
         return {
             'id': self.id,
             'plant_id': self.plant_id,
-            'image_url': generate_s3_url(self.image_url) if self.image_url else None
+            'image_url': image_url(self.image_url, self.image_variants, 'medium'),
+            'thumbnail_url': image_url(self.image_url, self.image_variants, 'thumb')
         }
 
     @classmethod
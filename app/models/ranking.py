@@ -0,0 +1,27 @@
+from app.extensions import db
+from sqlalchemy.orm import Mapped, mapped_column, relationship, contains_eager
+from sqlalchemy import ForeignKey
+from datetime import datetime
+
+class PlantRanking(db.Model):
+    """One row per position of a precomputed top list, rebuilt by `flask plants refresh-rankings`."""
+    __tablename__ = 'plant_rankings'
+
+    kind: Mapped[str] = mapped_column(db.String(20), primary_key=True)
+    position: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    plant_id: Mapped[int] = mapped_column(ForeignKey('plants.id', ondelete='CASCADE'))
+    score: Mapped[float]
+    refreshed_at: Mapped[datetime]
+
+    plant: Mapped["Plant"] = relationship()
+
+    @classmethod
+    def page_query(cls, kind):
+        # Plants come from the same join so a page is a single query
+        return (
+            db.select(cls)
+            .join(cls.plant)
+            .options(contains_eager(cls.plant))
+            .where(cls.kind == kind)
+            .order_by(cls.position)
+        )
@@ -1,13 +1,103 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from app.extensions import db
+from app.models.base import utc_timestamp
 
 user_plant_likes = db.Table(
     'user_plant_likes',
     db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
-    db.Column('plant_id', db.Integer, db.ForeignKey('plants.id'), primary_key=True)
+    db.Column('plant_id', db.Integer, db.ForeignKey('plants.id'), primary_key=True),
+    db.Column('created_at', db.DateTime, nullable=False, server_default=utc_timestamp()),
+    db.Index('ix_user_plant_likes_plant_id_user_id', 'plant_id', 'user_id'),
+    db.Index('ix_user_plant_likes_created_at', 'created_at')
 )
 
 user_plant_mylist = db.Table(
     'user_plant_mylist',
     db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
-    db.Column('plant_id', db.Integer, db.ForeignKey('plants.id'), primary_key=True)
+    db.Column('plant_id', db.Integer, db.ForeignKey('plants.id'), primary_key=True),
+    db.Index('ix_user_plant_mylist_plant_id_user_id', 'plant_id', 'user_id')
 )
+
+like_removals = db.Table(
+    'like_removals',
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('plant_id', db.Integer, db.ForeignKey('plants.id', ondelete='CASCADE'), nullable=False),
+    db.Column('liked_at', db.DateTime, nullable=False),
+    db.Column('removed_at', db.DateTime, nullable=False, server_default=utc_timestamp()),
+    db.Index('ix_like_removals_removed_at', 'removed_at')
+)
+
+
+def link_exists(table, user_id, plant_id):
+    query = db.select(db.literal(1)).where(table.c.user_id == user_id, table.c.plant_id == plant_id)
+    return db.session.scalar(query) is not None
+
+
+def add_link(table, user_id, plant_id):
+    # Returns False when a concurrent request already inserted the same row
+    values = {'user_id': user_id, 'plant_id': plant_id}
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        query = postgresql.insert(table).values(**values).on_conflict_do_nothing()
+    elif dialect == 'sqlite':
+        query = sqlite.insert(table).values(**values).on_conflict_do_nothing()
+    else:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(**values))
+            return True
+        except IntegrityError:
+            return False
+    return db.session.execute(query).rowcount == 1
+
+
+def add_links(table, pairs):
+    """Insert (user_id, plant_id) pairs in one statement; returns the plant_id of each row actually added."""
+    if not pairs:
+        return []
+    rows = [{'user_id': user_id, 'plant_id': plant_id} for user_id, plant_id in pairs]
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        query = postgresql.insert(table).values(rows).on_conflict_do_nothing()
+    elif dialect == 'sqlite':
+        query = sqlite.insert(table).values(rows).on_conflict_do_nothing()
+    else:
+        return [plant_id for user_id, plant_id in pairs if add_link(table, user_id, plant_id)]
+    return list(db.session.scalars(query.returning(table.c.plant_id)))
+
+
+def remove_links(table, pairs):
+    """Delete (user_id, plant_id) pairs in one statement; returns the plant_id of each row actually removed."""
+    if not pairs:
+        return []
+    # Removed likes are logged so the next rankings refresh can take them out of trending scores
+    tracked = table is user_plant_likes
+    columns = [table.c.plant_id, table.c.created_at] if tracked else [table.c.plant_id]
+    if db.session.get_bind().dialect.name in ('postgresql', 'sqlite'):
+        query = table.delete().where(db.tuple_(table.c.user_id, table.c.plant_id).in_(pairs))
+        removed = db.session.execute(query.returning(*columns)).all()
+    else:
+        removed = []
+        for user_id, plant_id in pairs:
+            pair = db.and_(table.c.user_id == user_id, table.c.plant_id == plant_id)
+            row = db.session.execute(db.select(*columns).where(pair)).first()
+            if row is not None and db.session.execute(table.delete().where(pair)).rowcount == 1:
+                removed.append(row)
+
+    if tracked and removed:
+        db.session.execute(like_removals.insert(), [
+            {'plant_id': row.plant_id, 'liked_at': row.created_at} for row in removed
+        ])
+    return [row.plant_id for row in removed]
+
+
+def remove_link(table, user_id, plant_id):
+    return bool(remove_links(table, [(user_id, plant_id)]))
+
+
+def toggle_link(table, user_id, plant_id):
+    # Returns the new state and whether this call changed it, so counters are only bumped once
+    if link_exists(table, user_id, plant_id):
+        return False, remove_link(table, user_id, plant_id)
+    return True, add_link(table, user_id, plant_id)
@@ -0,0 +1,41 @@
+from app.extensions import db
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey
+from datetime import datetime, timedelta
+from .base import utcnow
+
+class PendingUpload(db.Model):
+    __tablename__ = 'pending_uploads'
+
+    PURPOSE_COMMENT = 'comment'
+    PURPOSE_PLANT_IMAGE = 'plant_image'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    key: Mapped[str] = mapped_column(db.String(255), unique=True)
+    purpose: Mapped[str] = mapped_column(db.String(16))
+    content_type: Mapped[str] = mapped_column(db.String(100))
+    max_bytes: Mapped[int]
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    plant_id: Mapped[int] = mapped_column(ForeignKey('plants.id'))
+    created_at: Mapped[datetime] = mapped_column(default=db.func.current_timestamp())
+    expires_at: Mapped[datetime] = mapped_column(index=True)
+
+    @classmethod
+    def expiring_in(cls, seconds):
+        return utcnow() + timedelta(seconds=seconds)
+
+    @classmethod
+    def abandoned_query(cls, grace_seconds):
+        cutoff = utcnow() - timedelta(seconds=grace_seconds)
+        return db.select(cls).where(cls.expires_at < cutoff)
+
+    def to_dict(self, presigned_post=None):
+        return {
+            'id': self.id,
+            'key': self.key,
+            'purpose': self.purpose,
+            'plant_id': self.plant_id,
+            'expires_at': self.expires_at.isoformat(),
+            'url': presigned_post['url'] if presigned_post else None,
+            'fields': presigned_post['fields'] if presigned_post else None
+        }
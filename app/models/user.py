@@ -1,4 +1,4 @@
-from app.extensions import db, bcrypt
+from app.extensions import db, password_hasher
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .relationships import user_plant_likes, user_plant_mylist
 from typing import List
@@ -21,10 +21,13 @@ class User(db.Model):
     comments: Mapped[List["Comment"]] = relationship(back_populates="user")
 
     def set_password(self, password: str):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password: str) -> bool:
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self) -> bool:
+        return password_hasher.needs_rehash(self.password_hash)
 
     def to_dict(self):
         return {
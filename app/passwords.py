@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import threading
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated pool so login bursts can't occupy every request thread.
+
+    At most `queue_depth` hashes may be queued or running; beyond that callers get
+    PasswordHasherBusy straight away instead of piling up behind the pool.
+    """
+
+    def __init__(self, app=None):
+        self.rounds = 12
+        self.workers = 2
+        self.queue_depth = 32
+        self.timeout = 10
+        self._bcrypt = None
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.extensions import bcrypt
+
+        self._bcrypt = bcrypt
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.queue_depth = app.config.get('PASSWORD_HASH_QUEUE_DEPTH', 32)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.queue_depth)
+        app.extensions['password_hasher'] = self
+
+    def _get_executor(self):
+        # Created lazily so each forked worker process gets its own threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy()
+
+        with self._lock:
+            self._queued += 1
+
+        def task():
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self.completed += 1
+                self._slots.release()
+
+        future = self._get_executor().submit(task)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy()
+
+    def hash(self, password):
+        return self._run(self._bcrypt.generate_password_hash, password, self.rounds).decode('utf-8')
+
+    def verify(self, password_hash, password):
+        return self._run(self._bcrypt.check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        # bcrypt hashes look like $2b$<cost>$<salt+digest>
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'rounds': self.rounds,
+                'queued': self._queued,
+                'running': self._running,
+                'max_pending': self.queue_depth,
+                'completed': self.completed,
+                'rejected': self.rejected
+            }
@@ -0,0 +1,65 @@
+from datetime import datetime
+from app.extensions import db
+from app.models.comment import Comment
+from app.models.plant import Plant, PlantImage
+from app.models.relationships import user_plant_likes, user_plant_mylist
+
+
+def hot_queries(plant_id=1, user_id=1):
+    """The statements behind the busiest endpoints, in the shapes the routes and models issue them."""
+    return [
+        ('comment feed', Comment.feed_query(plant_id).limit(6)),
+        ('comment feed after cursor', Comment.feed_query_after(plant_id, (datetime.now(), 2 ** 31 - 1)).limit(6)),
+        ('comments by user', db.select(Comment.id).where(Comment.user_id == user_id)),
+        ('plant images', db.select(PlantImage).where(PlantImage.plant_id == plant_id)),
+        ('likes per plant', db.select(db.func.count()).where(user_plant_likes.c.plant_id == plant_id)),
+        ('saves per plant', db.select(db.func.count()).where(user_plant_mylist.c.plant_id == plant_id)),
+        ('liked ids for page', db.select(user_plant_likes.c.plant_id).where(
+            user_plant_likes.c.user_id == user_id,
+            user_plant_likes.c.plant_id.in_([plant_id, plant_id + 1])
+        )),
+        ('saved plants', db.select(Plant)
+            .join(user_plant_mylist, user_plant_mylist.c.plant_id == Plant.id)
+            .where(user_plant_mylist.c.user_id == user_id)
+            .order_by(Plant.id)
+            .limit(10)),
+    ]
+
+
+def sequential_scans(statement):
+    """Tables the database would scan in full to run `statement`, according to its EXPLAIN output."""
+    connection = db.session.connection()
+    dialect = connection.dialect
+    compiled = statement.compile(dialect=dialect, compile_kwargs={'render_postcompile': True})
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+
+    if dialect.name == 'postgresql':
+        # Small tables are cheaper to scan than to index; rule that out so only a missing index shows up
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {compiled}', params).scalar()
+        return sorted({node['Relation Name'] for node in _walk(plan[0]['Plan']) if node['Node Type'] == 'Seq Scan'})
+
+    if dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).all()
+        return sorted({
+            row.detail.split()[1] for row in rows
+            if row.detail.startswith('SCAN ') and ' USING ' not in row.detail
+        })
+
+    return []
+
+
+def _walk(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _walk(child)
+
+
+def check_query_plans(plant_id=1, user_id=1):
+    """[(label, [scanned tables])] for every hot query; the transaction is rolled back afterwards."""
+    try:
+        return [(label, sequential_scans(statement)) for label, statement in hot_queries(plant_id, user_id)]
+    finally:
+        db.session.rollback()
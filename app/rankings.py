@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta
+import math
+from flask import current_app
+from app.catalog import batched
+from app.extensions import db
+from app.models.base import utc_timestamp
+from app.models.comment import Comment
+from app.models.plant import Plant
+from app.models.ranking import PlantRanking
+from app.models.relationships import user_plant_likes, like_removals
+
+# kind -> (score column, which plants qualify)
+RANKINGS = {
+    'trending': (Plant.trending_score, Plant.trending_score.is_not(None)),
+    'most_liked': (Plant.likes_count, Plant.likes_count > 0),
+}
+
+# Trending scores are stored as log(sum(weight * e^((t - EPOCH) / tau))) over a plant's likes and comments.
+# Decay shrinks every score by the same factor, so ordering by this never-decayed value equals ordering
+# by the decayed one, and a refresh only has to touch plants with new activity.
+EPOCH = datetime(2026, 1, 1)
+
+# Activity this recent is left for the next refresh, so rows from transactions still in flight
+# (stamped with their start time) aren't skipped by the watermark
+SETTLE = timedelta(seconds=5)
+
+# Arbitrary key for the advisory lock that keeps refreshes from folding the same interval twice
+REFRESH_LOCK_KEY = 7_061_024
+
+
+def event_score(created_at, weight, tau):
+    return math.log(weight) + (created_at - EPOCH).total_seconds() / tau
+
+
+def log_add(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def log_subtract(a, b):
+    # None once nothing measurable is left
+    if b is None:
+        return a
+    if a is None or b - a >= -1e-9:
+        return None
+    return a + math.log1p(-math.exp(b - a))
+
+
+def update_trending_scores(since, until, subtract_removals=True):
+    """Fold likes and comments created in (since, until] into Plant.trending_score; returns plants updated.
+
+    Likes removed in the same interval are taken back out if an earlier refresh counted them,
+    so unliking and liking again doesn't keep raising a score.
+    """
+    config = current_app.config
+    tau = config['TRENDING_HALF_LIFE_HOURS'] * 3600 / math.log(2)
+    sources = [
+        (user_plant_likes.c.plant_id, user_plant_likes.c.created_at, 1.0),
+        (Comment.plant_id, Comment.created_at, config['TRENDING_COMMENT_WEIGHT']),
+    ]
+
+    added = {}
+    for plant_column, time_column, weight in sources:
+        if weight <= 0:
+            continue
+        query = db.select(plant_column, time_column).where(time_column > since, time_column <= until)
+        for plant_id, created_at in db.session.execute(query.execution_options(yield_per=1000)):
+            added[plant_id] = log_add(added.get(plant_id), event_score(created_at, weight, tau))
+
+    removed = {}
+    if subtract_removals:
+        query = db.select(like_removals.c.plant_id, like_removals.c.liked_at).where(
+            like_removals.c.removed_at > since,
+            like_removals.c.removed_at <= until,
+            like_removals.c.liked_at <= since
+        )
+        for plant_id, liked_at in db.session.execute(query.execution_options(yield_per=1000)):
+            removed[plant_id] = log_add(removed.get(plant_id), event_score(liked_at, 1.0, tau))
+    db.session.execute(db.delete(like_removals).where(like_removals.c.removed_at <= until))
+
+    updated = 0
+    for plant_ids in batched(list(added.keys() | removed.keys()), 1000):
+        current = dict(db.session.execute(
+            db.select(Plant.id, Plant.trending_score).where(Plant.id.in_(plant_ids))
+        ).all())
+        rows = [
+            {
+                'id': plant_id,
+                'trending_score': log_subtract(log_add(current[plant_id], added.get(plant_id)), removed.get(plant_id))
+            }
+            for plant_id in plant_ids if plant_id in current
+        ]
+        if rows:
+            db.session.execute(db.update(Plant), rows)
+        updated += len(rows)
+    return updated
+
+
+def rebuild_ranking(kind, size, now):
+    score_column, qualifies = RANKINGS[kind]
+    top = db.session.execute(
+        db.select(Plant.id, score_column)
+        .where(qualifies)
+        .order_by(score_column.desc(), Plant.id)
+        .limit(size)
+    ).all()
+
+    db.session.execute(db.delete(PlantRanking).where(PlantRanking.kind == kind))
+    if top:
+        db.session.execute(db.insert(PlantRanking), [
+            {'kind': kind, 'position': position, 'plant_id': plant_id, 'score': score, 'refreshed_at': now}
+            for position, (plant_id, score) in enumerate(top, start=1)
+        ])
+    return len(top)
+
+
+def lock_refresh():
+    # Held until the refresh commits; a refresh that waited then starts from the new watermark
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(db.select(db.func.pg_advisory_xact_lock(REFRESH_LOCK_KEY)))
+
+
+def database_now():
+    # Activity is stamped by the database clock, so the watermark comes from it too.
+    # clock_timestamp() rather than now(), which is frozen at the start of a transaction that may have waited.
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return db.session.scalar(db.text("SELECT clock_timestamp() AT TIME ZONE 'utc'"))
+    return db.session.scalar(db.select(utc_timestamp()))
+
+
+def refresh_rankings(full=False):
+    """Update trending scores from activity since the last refresh and rebuild every top list.
+
+    Returns {kind: plants listed}. `full` (or a first run) recomputes trending scores from the
+    last TRENDING_WINDOW_HOURS of activity instead.
+    """
+    config = current_app.config
+    lock_refresh()
+    now = database_now() - SETTLE
+
+    since = None
+    if not full:
+        since = db.session.scalar(
+            db.select(db.func.max(PlantRanking.refreshed_at)).where(PlantRanking.kind == 'trending')
+        )
+    if since is None:
+        db.session.execute(
+            db.update(Plant)
+            .where(Plant.trending_score.is_not(None))
+            .values(trending_score=None)
+            .execution_options(synchronize_session=False)
+        )
+        since = now - timedelta(hours=config['TRENDING_WINDOW_HOURS'])
+        full = True
+
+    # A full recompute only reads likes that still exist, so there is nothing to take back out
+    update_trending_scores(since, now, subtract_removals=not full)
+    listed = {kind: rebuild_ranking(kind, config['RANKING_SIZE'], now) for kind in RANKINGS}
+    db.session.commit()
+    return listed
@@ -0,0 +1,166 @@
+from functools import wraps
+import itertools
+import threading
+import time
+from flask import g, current_app, has_request_context
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+from app.cache import LocalCache
+from app.db_pool import engine_options
+
+
+class RoutingSession(Session):
+    """Session that reads from the replica picked for the current request, if any.
+
+    Flushes always go to the primary, as does everything outside a `replica_reads` view.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context():
+            replica = g.get('replica_engine')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Picks a read replica per request and keeps recent writers on the primary.
+
+    After a caller commits, their reads stay on the primary for REPLICA_READ_YOUR_WRITES
+    seconds so they don't see replication lag. The marker is kept in the response cache's
+    shared store when one is configured so every worker sees it.
+    """
+
+    def __init__(self, app=None):
+        self.engines = []
+        self.strategy = 'round_robin'
+        self.read_your_writes = 5
+        self.retry_after = 30
+        self.markers = LocalCache(maxsize=10000)
+        self._down_until = {}
+        self._cycle = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+        self.engines = [
+            create_engine(uri, **engine_options(dict(app.config, SQLALCHEMY_DATABASE_URI=uri)))
+            for uri in uris
+        ]
+        self.strategy = app.config.get('REPLICA_STRATEGY', 'round_robin')
+        self.read_your_writes = app.config.get('REPLICA_READ_YOUR_WRITES', 5)
+        self.retry_after = app.config.get('REPLICA_RETRY_AFTER', 30)
+        self._down_until = {}
+        self._cycle = itertools.cycle(range(len(self.engines)))
+
+        cache = app.extensions.get('response_cache')
+        if cache is not None and cache.shared is not None:
+            self.markers = cache.shared
+
+        app.extensions['replica_router'] = self
+
+    def available(self):
+        now = time.monotonic()
+        with self._lock:
+            return [
+                engine for engine in self.engines
+                if self._down_until.get(engine, 0) <= now
+            ]
+
+    def choose(self):
+        candidates = self.available()
+        if not candidates:
+            return None
+        if self.strategy == 'least_busy':
+            return min(candidates, key=_checked_out)
+        with self._lock:
+            for _ in range(len(self.engines)):
+                engine = self.engines[next(self._cycle)]
+                if engine in candidates:
+                    return engine
+        return None
+
+    def mark_down(self, engine):
+        with self._lock:
+            self._down_until[engine] = time.monotonic() + self.retry_after
+        engine.dispose()
+
+    def mark_written(self, user_id):
+        if self.engines and self.read_your_writes:
+            self.markers.set(f'ryw:{user_id}', 1, self.read_your_writes)
+
+    def recently_wrote(self, user_id):
+        return self.markers.get(f'ryw:{user_id}') is not None
+
+    def stats(self):
+        now = time.monotonic()
+        return [
+            {
+                'url': engine.url.render_as_string(hide_password=True),
+                'available': self._down_until.get(engine, 0) <= now,
+                'checked_out': _checked_out(engine)
+            }
+            for engine in self.engines
+        ]
+
+
+def _checked_out(engine):
+    return engine.pool.checkedout() if isinstance(engine.pool, QueuePool) else 0
+
+
+def _caller_id():
+    verify_jwt_in_request(optional=True)
+    return get_jwt_identity()
+
+
+def replica_reads(view):
+    """Run a read-only view against a replica, retrying it on the primary if the replica fails."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        router = current_app.extensions.get('replica_router')
+        if router is None or not router.engines:
+            return view(*args, **kwargs)
+
+        caller_id = _caller_id()
+        if caller_id and router.recently_wrote(caller_id):
+            return view(*args, **kwargs)
+
+        engine = router.choose()
+        if engine is None:
+            return view(*args, **kwargs)
+
+        g.replica_engine = engine
+        try:
+            return view(*args, **kwargs)
+        except OperationalError as error:
+            print(f"Replica {engine.url.host or engine.url.database} failed, reading from primary: {error}")
+            router.mark_down(engine)
+            g.replica_engine = None
+            current_app.extensions['sqlalchemy'].session.rollback()
+            return view(*args, **kwargs)
+        finally:
+            g.replica_engine = None
+
+    return wrapper
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def remember_writer(session):
+    if not has_request_context():
+        return
+    router = current_app.extensions.get('replica_router')
+    if router is None or not router.engines:
+        return
+    try:
+        caller_id = get_jwt_identity()
+    except RuntimeError:
+        # No token was checked on this request (e.g. register); the view marks the writer itself
+        return
+    if caller_id:
+        router.mark_written(caller_id)
@@ -0,0 +1,48 @@
+import hmac
+from flask import Blueprint, request, jsonify, current_app, abort
+from app.extensions import db, replica_router, instrumentation, password_hasher
+from ..db_pool import pool_stats
+from ..instrumentation import render_prometheus
+from ..s3_helper import get_url_cache_stats
+
+ops_bp = Blueprint("ops_bp", __name__, url_prefix="/ops")
+
+@ops_bp.before_request
+def require_ops_token():
+    # Without OPS_TOKEN these endpoints only exist in debug/testing
+    token = current_app.config.get('OPS_TOKEN')
+    if not token:
+        if not (current_app.debug or current_app.testing):
+            abort(404)
+        return
+    if not hmac.compare_digest(request.headers.get('X-Ops-Token', ''), token):
+        abort(404)
+
+@ops_bp.get("/pool")
+def get_pool_stats():
+    stats = pool_stats(db.engine.pool)
+    if replica_router.engines:
+        stats['replicas'] = [
+            dict(replica, **pool_stats(engine.pool))
+            for replica, engine in zip(replica_router.stats(), replica_router.engines)
+        ]
+    return jsonify(stats), 200
+
+@ops_bp.get("/metrics")
+def get_metrics():
+    gauges = []
+    pools = [('primary', db.engine.pool)] + [
+        (f'replica{index}', engine.pool) for index, engine in enumerate(replica_router.engines)
+    ]
+    for name, pool in pools:
+        for key, value in pool_stats(pool).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges.append((f'app_db_pool_{key}', 'Connection pool state and checkout waits', {'engine': name}, value))
+    for key, value in get_url_cache_stats().items():
+        if isinstance(value, (int, float)):
+            gauges.append((f'app_presigned_url_cache_{key}', 'Presigned URL cache', {}, value))
+    for key, value in password_hasher.stats().items():
+        gauges.append((f'app_password_hasher_{key}', 'bcrypt pool', {}, value))
+
+    body = render_prometheus(instrumentation.snapshot(), gauges)
+    return body, 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
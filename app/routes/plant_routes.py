@@ -1,98 +1,331 @@
-from flask import Blueprint, request, jsonify, g
-from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from datetime import datetime
+from flask import Blueprint, request, jsonify, g, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask_cors import cross_origin
-from app.extensions import db
+from app.extensions import db, response_cache, job_queue, toggle_buffer
 from app.models.comment import Comment
 from app.models.plant import Plant
-from app.models.user import User
-from .route_utilities import validate_model, create_model
-from ..s3_helper import upload_file_to_s3
-
-MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+from app.models.ranking import PlantRanking
+from app.models.relationships import user_plant_likes, user_plant_mylist, toggle_link
+from .route_utilities import (
+    validate_model, parse_id, create_model, decode_cursor, fetch_keyset_page, versioned_etag, conditional
+)
+from ..s3_helper import new_object_key, upload_stream_to_s3, download_s3_object, delete_s3_object
+from ..search import apply_plant_search
+from ..rankings import RANKINGS
+from ..identity import get_current_user
+from ..images import store_variants
+from ..replicas import replica_reads
+from ..uploads import MultipartStream, TeeReader, UploadTooLarge, FieldTooLarge, MalformedUpload, new_spool
 
 plants_bp = Blueprint("plants_bp", __name__, url_prefix="/plants")
 
 @plants_bp.get("")
 @cross_origin()
+@replica_reads
+@response_cache.cached(lambda: ['plants'])
 def get_homepage_plants():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     search_query = request.args.get('search', '', type=str)
+    sort = request.args.get('sort', '', type=str)
+
+    if sort:
+        if sort not in RANKINGS:
+            return jsonify({"error": f"Unknown sort {sort}, expected one of: {', '.join(RANKINGS)}"}), 400
+        return get_ranked_plants(sort, search_query, page, per_page)
+
+    query = db.select(Plant).order_by(Plant.id)
+    cursor_mode = 'after' in request.args
+    if search_query:
+        # Keyset pages follow id order, so relevance ranking only applies to offset pages
+        query = apply_plant_search(query, search_query, ranked=not cursor_mode)
+
+    if cursor_mode:
+        after = request.args.get('after')
+        if after:
+            after_id, = decode_cursor(after, int)
+            query = query.where(Plant.id > after_id)
+        plants, next_cursor = fetch_keyset_page(query, per_page, key=lambda plant: (plant.id,))
+        return jsonify({
+            'plants': Plant.to_list_dicts(plants, current_user=get_current_user()),
+            'next_cursor': next_cursor
+        })
+
+    pagination = db.paginate(query, page=page, per_page=per_page, error_out=False)
+
+    return jsonify({
+        'plants': Plant.to_list_dicts(pagination.items, current_user=get_current_user()),
+        'total': pagination.total,
+        'pages': pagination.pages,
+        'current_page': pagination.page
+    })
 
-    query = db.select(Plant)
+def get_ranked_plants(sort, search_query, page, per_page):
+    # Top lists are precomputed by `flask plants refresh-rankings`; pages follow their positions
+    query = PlantRanking.page_query(sort)
     if search_query:
-        query = query.where(Plant.name.ilike(f'%{search_query}%'))
+        query = apply_plant_search(query, search_query, ranked=False)
+
+    if 'after' in request.args:
+        after = request.args.get('after')
+        if after:
+            after_position, = decode_cursor(after, int)
+            query = query.where(PlantRanking.position > after_position)
+        rankings, next_cursor = fetch_keyset_page(query, per_page, key=lambda ranking: (ranking.position,))
+        return jsonify({
+            'plants': Plant.to_list_dicts([ranking.plant for ranking in rankings], current_user=get_current_user()),
+            'next_cursor': next_cursor
+        })
 
     pagination = db.paginate(query, page=page, per_page=per_page, error_out=False)
 
     return jsonify({
-        'plants': [plant.to_list_dict() for plant in pagination.items],
+        'plants': Plant.to_list_dicts([ranking.plant for ranking in pagination.items], current_user=get_current_user()),
         'total': pagination.total,
         'pages': pagination.pages,
         'current_page': pagination.page
     })
 
+def detail_etag(plant_id, version):
+    viewer = get_current_user()
+    viewer_id = viewer.id if viewer else 0
+    return versioned_etag('detail', int(plant_id), version, viewer_id, current_app.config['COMMENTS_PAGE_SIZE'])
+
+def comments_etag(plant_id, version):
+    return versioned_etag('comments', int(plant_id), version, sorted(request.args.items(multi=True)))
+
+def current_etag(etag_func):
+    # Only the version column is read; None falls through to the view's own 400/404
+    def compute(plant_id):
+        if parse_id(plant_id) is None:
+            return None
+        version = Plant.version_of(parse_id(plant_id))
+        return etag_func(plant_id, version) if version is not None else None
+    return compute
+
+@plants_bp.get("/batch")
+@cross_origin()
+@replica_reads
+def get_plants_batch():
+    shape = request.args.get('shape', 'list', type=str)
+    if shape not in ('list', 'detail'):
+        return jsonify({"error": "shape must be list or detail"}), 400
+
+    # Accepts ids=1,2,3 as well as repeated ids parameters
+    raw_ids = [raw for value in request.args.getlist('ids') for raw in value.split(',') if raw.strip()]
+    try:
+        plant_ids = list(dict.fromkeys(int(raw) for raw in raw_ids))
+    except ValueError:
+        return jsonify({"error": "ids must be comma-separated integers"}), 400
+    if not plant_ids:
+        return jsonify({"error": "ids is required"}), 400
+    max_ids = current_app.config['PLANT_BATCH_MAX_IDS']
+    if len(plant_ids) > max_ids:
+        return jsonify({"error": f"At most {max_ids} ids per request"}), 400
+
+    query = Plant.batch_query(plant_ids, with_images=shape == 'detail')
+    found = {plant.id: plant for plant in db.session.scalars(query)}
+    plants = [found[plant_id] for plant_id in plant_ids if plant_id in found]
+    to_dicts = Plant.to_detail_dicts if shape == 'detail' else Plant.to_list_dicts
+    return jsonify({
+        'plants': to_dicts(plants, current_user=get_current_user()),
+        'missing': [plant_id for plant_id in plant_ids if plant_id not in found]
+    })
+
 @plants_bp.get("/<plant_id>")
 @cross_origin()
+@replica_reads
+@conditional(current_etag(detail_etag))
+@response_cache.cached(lambda plant_id: [f'plant:{parse_id(plant_id)}'] if parse_id(plant_id) is not None else [])
 def get_plant_details(plant_id):
     plant = validate_model(Plant, plant_id)
-    return jsonify(plant.to_detail_dict(current_user=get_current_user())), 200
+    comments, next_cursor = fetch_keyset_page(
+        Comment.feed_query(plant.id),
+        current_app.config['COMMENTS_PAGE_SIZE'],
+        key=Comment.cursor_key
+    )
+    response = jsonify(plant.to_detail_dict(
+        current_user=get_current_user(),
+        comments=comments,
+        comments_next_cursor=next_cursor
+    ))
+    response.set_etag(detail_etag(plant.id, plant.version))
+    response.vary.add('Authorization')
+    return response, 200
 
 @plants_bp.post("/<plant_id>/comments")
 @jwt_required()
 @cross_origin()
 def add_comment(plant_id):
     plant = validate_model(Plant, plant_id)
-    content = request.form.get('content')
-    image_file = request.files.get('image')
+    max_bytes = current_app.config['COMMENT_IMAGE_MAX_BYTES']
+    background = current_app.config['COMMENT_IMAGE_UPLOAD_MODE'] == 'background'
 
+    # Multipart bodies are parsed straight off the socket so the image is never spooled whole
+    multipart = MultipartStream.from_request(request)
+    form = multipart.form if multipart else request.form
+
+    image_key = image_status = spooled = None
+
+    def discard_image():
+        if spooled:
+            spooled.close()
+        if image_key and not background:
+            delete_s3_object(image_key)
+
+    try:
+        image_file = multipart.next_file('image') if multipart else None
+        if image_file:
+            if not image_file.content_type.startswith('image/'):
+                return jsonify({"error": "Invalid file type. Only images allowed"}), 400
+
+            image_file.max_bytes = max_bytes
+            if background:
+                spooled = image_file.spool()
+                image_key = new_object_key()
+            else:
+                # Keep a copy while streaming so variants can be rendered after the response
+                spooled = new_spool()
+                image_key = upload_stream_to_s3(TeeReader(image_file, spooled), image_file.content_type)
+                if not image_key:
+                    spooled.close()
+                    return jsonify({"error": "Failed to upload image"}), 500
+                spooled.seek(0)
+            # Inline uploads are servable at once; variants replace the original when ready
+            image_status = Comment.IMAGE_PENDING if background else Comment.IMAGE_READY
+        if multipart:
+            multipart.finish()
+    except UploadTooLarge:
+        discard_image()
+        return jsonify({"error": f"File size exceeds {max_bytes // (1024 * 1024)}MB limit"}), 413
+    except FieldTooLarge as e:
+        discard_image()
+        return jsonify({"error": str(e)}), 413
+    except MalformedUpload:
+        discard_image()
+        return jsonify({"error": "Malformed upload"}), 400
+
+    content = form.get('content')
     if not content:
+        discard_image()
         return jsonify({"error": "Content is required"}), 400
 
-    image_key = None
-    if image_file:
-        if not image_file.content_type.startswith('image/'):
-            return jsonify({"error": "Invalid file type. Only images allowed"}), 400
+    comment = add_plant_comment(plant, get_jwt_identity(), content, image_key, image_status)
 
-        if request.content_length > MAX_FILE_SIZE + 1024:
-            return jsonify({"error": "File size exceeds 5MB limit"}), 413
-        image_key = upload_file_to_s3(image_file)
-        if not image_key:
-            return jsonify({"error": "Failed to upload image"}), 500
+    if spooled:
+        # The spool only exists in this process, so these jobs never go to the database queue
+        job_queue.enqueue(
+            'comment_image.process',
+            local=True,
+            comment_id=comment['id'],
+            spooled=spooled,
+            content_type=image_file.content_type,
+            upload_original=background
+        )
+    return jsonify(comment), 201
 
-    user_id = get_jwt_identity()
 
+def add_plant_comment(plant, user_id, content, image_key=None, image_status=None):
     comment_data = {
         "content": content,
         "user_id": user_id,
         "plant_id": plant.id,
-        "image_key": image_key  # Store just the key
+        "image_key": image_key,  # Store just the key
+        "image_status": image_status
     }
 
-    return jsonify(create_model(Comment, comment_data)), 201
+    # Committed together with the comment by create_model
+    Plant.adjust_counts(plant.id, comments_count=1)
+    comment = create_model(Comment, comment_data)
+    response_cache.invalidate_plant(plant.id)
+    return comment
+
+
+def comment_image_failed(comment_id, spooled=None, upload_original=False, **payload):
+    if spooled is not None:
+        spooled.close()
+    # Only a deferred upload leaves the comment without a usable original
+    if upload_original:
+        comment = db.session.get(Comment, comment_id)
+        comment.image_status = Comment.IMAGE_FAILED
+        Plant.touch(comment.plant_id)
+        db.session.commit()
+        response_cache.invalidate_plant(comment.plant_id)
+
+
+@job_queue.task('comment_image.process', on_dead=comment_image_failed)
+def process_comment_image(comment_id, spooled=None, content_type=None, upload_original=False):
+    # Without a spool the original is already in the bucket (direct uploads) and is read back.
+    # The spool stays open until the job succeeds or is given up on, so retries can reread it.
+    # The connection goes back to the pool while the image is transferred and rendered
+    image_key = db.session.get(Comment, comment_id).image_key
+    db.session.commit()
+
+    if spooled is None:
+        source = download_s3_object(image_key)
+        if source is None:
+            raise RuntimeError(f"Could not read {image_key} from storage")
+    else:
+        source = spooled
+        source.seek(0)
+        if upload_original and not upload_stream_to_s3(source, content_type, key=image_key):
+            raise RuntimeError(f"Could not upload {image_key}")
+        source.seek(0)
+
+    variants = store_variants(source, image_key)
+    source.close()
+
+    comment = db.session.get(Comment, comment_id)
+    if comment is None:
+        return
+    comment.image_variants = variants
+    comment.image_status = Comment.IMAGE_READY
+    Plant.touch(comment.plant_id)
+    db.session.commit()
+    response_cache.invalidate_plant(comment.plant_id)
 
 
 @plants_bp.get("/<plant_id>/comments")
 @cross_origin()
+@replica_reads
+@conditional(current_etag(comments_etag))
 def get_comments(plant_id):
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 5, type=int)
+    per_page = request.args.get('per_page', current_app.config['COMMENTS_PAGE_SIZE'], type=int)
 
     plant = validate_model(Plant, plant_id)
-    comments_query = Comment.query.filter_by(plant_id=plant_id).order_by(Comment.created_at.desc())
 
-    pagination = comments_query.paginate(
+    if 'after' in request.args:
+        after = request.args.get('after')
+        after_key = decode_cursor(after, datetime, int) if after else None
+        comments, next_cursor = fetch_keyset_page(
+            Comment.feed_query_after(plant.id, after=after_key),
+            per_page,
+            key=Comment.cursor_key
+        )
+        response = jsonify({
+            'comments': [comment.to_dict() for comment in comments],
+            'next_cursor': next_cursor
+        })
+        response.set_etag(comments_etag(plant.id, plant.version))
+        return response, 200
+
+    pagination = db.paginate(
+        Comment.feed_query(plant.id),
         page=page,
         per_page=per_page,
         error_out=False
     )
 
-    return jsonify({
+    response = jsonify({
         'comments': [comment.to_dict() for comment in pagination.items],
         'total_pages': pagination.pages,
         'current_page': pagination.page,
         'total_comments': pagination.total
-    }), 200
+    })
+    response.set_etag(comments_etag(plant.id, plant.version))
+    return response, 200
 
 
 @plants_bp.post("/<plant_id>/like")
@@ -105,17 +338,23 @@ def like_plant(plant_id):
 
     plant = validate_model(Plant, plant_id)
 
-    if plant in current_user.liked_plants:
-        current_user.liked_plants.remove(plant)
-        liked = False
-    else:
-        current_user.liked_plants.append(plant)
-        liked = True
+    if toggle_buffer.enabled:
+        liked = toggle_buffer.toggle(user_plant_likes, current_user.id, plant.id)
+        return jsonify({
+            "liked": liked,
+            "likes_count": max(0, plant.likes_count + toggle_buffer.pending_delta(user_plant_likes, plant.id))
+        }), 200
 
+    liked, changed = toggle_link(user_plant_likes, current_user.id, plant.id)
+    likes_count = plant.likes_count
+    if changed:
+        likes_count, = Plant.adjust_counts(plant.id, likes_count=1 if liked else -1)
     db.session.commit()
+    if changed:
+        response_cache.invalidate_plant(plant.id, listing=True)
     return jsonify({
         "liked": liked,
-        "likes_count": plant.liked_by.count()
+        "likes_count": likes_count
     }), 200
 
 
@@ -128,25 +367,21 @@ def save_plant(plant_id):
         return jsonify({'error': 'User not found'}), 400
     plant = validate_model(Plant, plant_id)
 
-    if plant in current_user.saved_plants:
-        current_user.saved_plants.remove(plant)
-        saved = False
-    else:
-        current_user.saved_plants.append(plant)
-        saved = True
+    if toggle_buffer.enabled:
+        saved = toggle_buffer.toggle(user_plant_mylist, current_user.id, plant.id)
+        return jsonify({
+            "saved": saved,
+            "saves_count": max(0, plant.saves_count + toggle_buffer.pending_delta(user_plant_mylist, plant.id))
+        }), 200
 
+    saved, changed = toggle_link(user_plant_mylist, current_user.id, plant.id)
+    saves_count = plant.saves_count
+    if changed:
+        saves_count, = Plant.adjust_counts(plant.id, saves_count=1 if saved else -1)
     db.session.commit()
+    if changed:
+        response_cache.invalidate_plant(plant.id)
     return jsonify({
         "saved": saved,
-        "saves_count": plant.saved_by_users.count()
+        "saves_count": saves_count
     }), 200
-
-def get_current_user():
-    verify_jwt_in_request(optional=True)
-    current_user_id = get_jwt_identity()
-    if not current_user_id:
-        return None
-    current_user = User.query.get(int(current_user_id))
-    if not current_user:
-        return None
-    return current_user
\ No newline at end of file
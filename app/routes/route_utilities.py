@@ -1,6 +1,11 @@
-from flask import abort, make_response
+import base64
+import hashlib
+import json
+import time
+from datetime import datetime
+from functools import wraps
+from flask import abort, make_response, request, current_app
 from app.extensions import db
-from flask_jwt_extended import get_jwt_identity
 
 def validate_model(cls, model_id):
     try:
@@ -18,6 +23,59 @@ def validate_model(cls, model_id):
 
     return model
 
+def parse_id(value):
+    # int() rather than isdigit(), which also accepts characters like '²' that int() rejects
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+def encode_cursor(*values):
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token, *types):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+        if len(values) != len(types):
+            raise ValueError
+        return tuple(
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value, value_type in zip(values, types)
+        )
+    except (ValueError, TypeError):
+        response = {"message": f"Cursor {token} is invalid"}
+        abort(make_response(response, 400))
+
+def fetch_keyset_page(query, per_page, key):
+    # List endpoints switch to these cursor pages when `after` is passed (empty for the first page).
+    per_page = min(max(per_page, 1), current_app.config['CURSOR_PAGE_MAX'])
+    # One extra row tells us whether there is a next page without running COUNT(*)
+    items = db.session.scalars(query.limit(per_page + 1)).all()
+    next_cursor = encode_cursor(*key(items[per_page - 1])) if len(items) > per_page else None
+    return items[:per_page], next_cursor
+
+def versioned_etag(*parts):
+    # Rotates every ETAG_URL_WINDOW seconds; create_app keeps cached presigned URLs valid for at least that long
+    window = int(time.time() // current_app.config['ETAG_URL_WINDOW'])
+    return hashlib.sha1(repr((*parts, window)).encode()).hexdigest()
+
+def conditional(compute_etag):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Short-circuit matching If-None-Match before the view runs any serialization
+            if request.if_none_match:
+                etag = compute_etag(**kwargs)
+                if etag and request.if_none_match.contains(etag):
+                    response = make_response("", 304)
+                    response.set_etag(etag)
+                    return response
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
 def create_model(cls, model_data):
     try:
         new_model = cls.from_dict(model_data)
@@ -29,9 +87,3 @@ def create_model(cls, model_data):
     db.session.commit()
 
     return new_model.to_dict()
-
-def get_current_user():
-    current_user_id = get_jwt_identity()
-    if current_user_id:
-        return User.query.get(int(current_user_id))
-    return None
@@ -0,0 +1,116 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_cors import cross_origin
+from app.extensions import db, response_cache, job_queue
+from app.images import store_variants
+from app.models.comment import Comment
+from app.models.plant import Plant, PlantImage
+from app.models.upload import PendingUpload
+from .plant_routes import add_plant_comment
+from .route_utilities import validate_model
+from ..s3_helper import new_object_key, generate_presigned_post, head_s3_object, download_s3_object
+
+uploads_bp = Blueprint("uploads_bp", __name__, url_prefix="/uploads")
+
+KEY_PREFIXES = {
+    PendingUpload.PURPOSE_COMMENT: "comments",
+    PendingUpload.PURPOSE_PLANT_IMAGE: "plants",
+}
+
+@uploads_bp.post("")
+@jwt_required()
+@cross_origin()
+def create_upload():
+    data = request.get_json() or {}
+    purpose = data.get('purpose', PendingUpload.PURPOSE_COMMENT)
+    content_type = data.get('content_type', '')
+    user_id = int(get_jwt_identity())
+
+    if purpose not in KEY_PREFIXES:
+        return jsonify({'message': f'Unknown upload purpose {purpose}'}), 400
+    if purpose == PendingUpload.PURPOSE_PLANT_IMAGE and user_id not in current_app.config['PLANT_IMAGE_UPLOADER_IDS']:
+        return jsonify({'message': 'Not allowed to upload plant images'}), 403
+    if not content_type.startswith('image/'):
+        return jsonify({'message': 'Invalid file type. Only images allowed'}), 400
+
+    plant_id = data.get('plant_id')
+    if not str(plant_id).isdigit():
+        return jsonify({'message': 'plant_id must be an integer'}), 400
+
+    plant = validate_model(Plant, plant_id)
+    expires_in = current_app.config['DIRECT_UPLOAD_EXPIRATION']
+    upload = PendingUpload(
+        key=new_object_key(KEY_PREFIXES[purpose]),
+        purpose=purpose,
+        content_type=content_type,
+        max_bytes=current_app.config['COMMENT_IMAGE_MAX_BYTES'],
+        user_id=user_id,
+        plant_id=plant.id,
+        expires_at=PendingUpload.expiring_in(expires_in)
+    )
+
+    presigned_post = generate_presigned_post(upload.key, content_type, upload.max_bytes, expiration=expires_in)
+    if not presigned_post:
+        return jsonify({'message': 'Failed to prepare upload'}), 500
+
+    db.session.add(upload)
+    db.session.commit()
+    return jsonify(upload.to_dict(presigned_post)), 201
+
+@uploads_bp.post("/<upload_id>/confirm")
+@jwt_required()
+@cross_origin()
+def confirm_upload(upload_id):
+    upload = validate_model(PendingUpload, upload_id)
+    if upload.user_id != int(get_jwt_identity()):
+        return jsonify({'message': f'PendingUpload {upload_id} not found'}), 404
+
+    # Re-check what actually landed in the bucket; the policy is only enforced by S3
+    stored = head_s3_object(upload.key)
+    if not stored:
+        return jsonify({'message': 'Upload has not been received yet'}), 409
+    if stored['ContentLength'] > upload.max_bytes or stored.get('ContentType') != upload.content_type:
+        return jsonify({'message': 'Uploaded file does not match the upload policy'}), 400
+
+    plant = validate_model(Plant, upload.plant_id)
+
+    if upload.purpose == PendingUpload.PURPOSE_COMMENT:
+        content = (request.get_json(silent=True) or {}).get('content')
+        if not content:
+            return jsonify({"error": "Content is required"}), 400
+
+        db.session.delete(upload)
+        comment = add_plant_comment(plant, upload.user_id, content, upload.key, Comment.IMAGE_READY)
+        job_queue.enqueue('comment_image.process', comment_id=comment['id'])
+        return jsonify(comment), 201
+
+    image = PlantImage(plant_id=plant.id, image_url=upload.key)
+    db.session.add(image)
+    db.session.delete(upload)
+    Plant.touch(plant.id)
+    db.session.commit()
+    response_cache.invalidate_plant(plant.id)
+
+    job_queue.enqueue('plant_image.process', image_id=image.id)
+    return jsonify(image.to_dict()), 201
+
+
+@job_queue.task('plant_image.process')
+def process_plant_image(image_id):
+    # The connection goes back to the pool while the image is downloaded and rendered
+    key = db.session.get(PlantImage, image_id).image_url
+    db.session.commit()
+
+    source = download_s3_object(key)
+    if source is None:
+        raise RuntimeError(f"Could not read {key} from storage")
+    with source:
+        variants = store_variants(source, key)
+
+    image = db.session.get(PlantImage, image_id)
+    if image is None:
+        return
+    image.image_variants = variants
+    Plant.touch(image.plant_id)
+    db.session.commit()
+    response_cache.invalidate_plant(image.plant_id)
@@ -1,14 +1,24 @@
 from flask import Blueprint, request, jsonify
+from werkzeug.exceptions import HTTPException
 from flask_cors import cross_origin
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 
-from app.extensions import db
+from app.extensions import db, replica_router
+from app.models.plant import Plant
+from app.models.relationships import user_plant_mylist
 from app.models.user import User
-from .route_utilities import validate_model
-from ..s3_helper import generate_s3_url
+from app.passwords import PasswordHasherBusy
+from .route_utilities import validate_model, decode_cursor, fetch_keyset_page
+from ..identity import get_current_user, identity_claims, invalidate_identity
+from ..images import image_url
+from ..replicas import replica_reads
 
 users_bp = Blueprint("users_bp", __name__, url_prefix="/users")
 
+@users_bp.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(error):
+    return jsonify({'message': 'Server is busy, please try again shortly'}), 503, {'Retry-After': '1'}
+
 @users_bp.post("/register")
 @cross_origin()
 def register():
@@ -27,8 +37,9 @@ def register():
     user.set_password(password)
     db.session.add(user)
     db.session.commit()
+    replica_router.mark_written(user.id)
 
-    access_token = create_access_token(identity=str(user.id))
+    access_token = create_access_token(identity=str(user.id), additional_claims=identity_claims(user))
     return jsonify({'message': 'User registered successfully', 'access_token': access_token}), 201
 
 @users_bp.post("/login")
@@ -41,7 +52,11 @@ def login():
     user = db.session.execute(db.select(User).where(User.username == username)).scalar_one_or_none()
 
     if user and user.check_password(password):
-        access_token = create_access_token(identity=str(user.id))
+        # Upgrade hashes made with a different work factor while we have the plaintext
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+        access_token = create_access_token(identity=str(user.id), additional_claims=identity_claims(user))
         return jsonify({'access_token': access_token}), 200
 
     return jsonify({'message': 'Invalid credentials'}), 401
@@ -49,11 +64,14 @@ def login():
 @users_bp.get("/profile")
 @jwt_required()
 @cross_origin()
+@replica_reads
 def get_user_profile():
     try:
         current_user_id = int(get_jwt_identity())
         user = validate_model(User, current_user_id)
-        return jsonify({'username': user.username, 'email': user.email}), 200
+        response = jsonify({'username': user.username, 'email': user.email})
+        response.add_etag()
+        return response.make_conditional(request)
     except ValueError:
         return jsonify({'message': 'Invalid user ID'}), 400
 
@@ -70,6 +88,7 @@ def update_user_profile():
             user.email = data['email']
 
         db.session.commit()
+        invalidate_identity(current_user_id)
         return jsonify({'message': 'Profile updated successfully'}), 200
     except ValueError:
         return jsonify({'message': 'Invalid user ID'}), 400
@@ -77,35 +96,60 @@ def update_user_profile():
 
 @users_bp.route('/saved-plants', methods=['GET'])
 @jwt_required()
+@replica_reads
 def get_saved_plants():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 6, type=int)
 
-        user_id = get_jwt_identity()
-        user = User.query.get_or_404(user_id)
+        user = get_current_user()
+        if not user:
+            return jsonify({'message': 'User not found'}), 404
 
-        # Use the dynamic query
-        paginated_plants = user.saved_plants.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
+        query = (
+            db.select(Plant)
+            .join(user_plant_mylist, user_plant_mylist.c.plant_id == Plant.id)
+            .where(user_plant_mylist.c.user_id == user.id)
+            .order_by(Plant.id)
         )
 
-        plants_data = [{
-            'id': plant.id,
-            'name': plant.name,
-            'main_image_url': generate_s3_url(plant.main_image_url) if plant.main_image_url else None,
-            'likes_count': plant.liked_by.count(),  # Now using count() instead of len()
-            'saves_count': plant.saved_by_users.count()
-        } for plant in paginated_plants.items]
+        if 'after' in request.args:
+            after = request.args.get('after')
+            if after:
+                after_id, = decode_cursor(after, int)
+                query = query.where(Plant.id > after_id)
+            plants, next_cursor = fetch_keyset_page(query, per_page, key=lambda plant: (plant.id,))
+            response = jsonify({
+                'plants': [saved_plant_dict(plant) for plant in plants],
+                'next_cursor': next_cursor
+            })
+            response.add_etag()
+            return response.make_conditional(request)
+
+        paginated_plants = db.paginate(query, page=page, per_page=per_page, error_out=False)
+
+        plants_data = [saved_plant_dict(plant) for plant in paginated_plants.items]
 
-        return jsonify({
+        response = jsonify({
             'plants': plants_data,
             'total_pages': paginated_plants.pages,
             'current_page': paginated_plants.page,
             'total_items': paginated_plants.total
-        }), 200
+        })
+        response.add_etag()
+        return response.make_conditional(request)
 
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+def saved_plant_dict(plant):
+    return {
+        'id': plant.id,
+        'name': plant.name,
+        'main_image_url': image_url(plant.main_image_url, plant.main_image_variants, 'thumb'),
+        'likes_count': plant.likes_count,
+        'saves_count': plant.saves_count
+    }
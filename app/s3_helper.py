@@ -1,8 +1,78 @@
+from collections import OrderedDict
 from functools import lru_cache
 import boto3
 import os
+import tempfile
+import threading
+import time
 from botocore.exceptions import ClientError
 from uuid import uuid4
+from app.instrumentation import record
+
+
+class PresignedUrlCache:
+    """Bounded LRU of presigned URLs, served until `safety_margin` seconds before they expire."""
+
+    def __init__(self, maxsize=4096, safety_margin=300):
+        self.maxsize = maxsize
+        self.safety_margin = safety_margin
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            url, fresh_until = entry
+            if time.monotonic() >= fresh_until:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return url
+
+    def put(self, key, url, expiration):
+        fresh_for = expiration - self.safety_margin
+        if fresh_for <= 0 or self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (url, time.monotonic() + fresh_for)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+
+url_cache = PresignedUrlCache(
+    maxsize=int(os.getenv('S3_URL_CACHE_SIZE', 4096)),
+    safety_margin=int(os.getenv('S3_URL_CACHE_SAFETY_MARGIN', 300))
+)
 
 @lru_cache(maxsize=None)
 def get_s3_client():
@@ -10,39 +80,106 @@ def get_s3_client():
         's3',
         aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
         aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-        region_name=os.getenv('AWS_REGION')
+        region_name=os.getenv('AWS_REGION'),
+        # Points at an S3-compatible stand-in (moto server, MinIO) in development
+        endpoint_url=os.getenv('S3_ENDPOINT_URL')
     )
 
-def upload_file_to_s3(file, bucket_name=None):
+def new_object_key(prefix="comments"):
+    return f"{prefix}/{uuid4().hex}"
+
+class _StreamReader:
+    # Exposes only read() so s3transfer streams in chunks and leaves the caller's file open
+    def __init__(self, stream):
+        self.read = stream.read
+
+def upload_stream_to_s3(stream, content_type, key=None, bucket_name=None):
+    # upload_fileobj pulls fixed-size chunks from `stream`; errors raised by read() propagate
     s3 = get_s3_client()
     bucket_name = bucket_name or os.getenv('S3_BUCKET_NAME')
+    key = key or new_object_key()
 
     try:
-        filename = f"comments/{uuid4().hex}"
-        s3.upload_fileobj(
-            file,
+        s3.upload_fileobj(_StreamReader(stream), bucket_name, key, ExtraArgs={"ContentType": content_type})
+        return key
+    except ClientError as e:
+        print(f"Error uploading to S3: {e}")
+        return None
+
+def generate_presigned_post(key, content_type, max_bytes, bucket_name=None, expiration=900):
+    # The policy pins the key, content type and size so the client can't upload anything else
+    s3 = get_s3_client()
+    bucket_name = bucket_name or os.getenv('S3_BUCKET_NAME')
+
+    try:
+        return s3.generate_presigned_post(
             bucket_name,
-            filename,
-            ExtraArgs={
-                "ContentType": file.content_type
-            }
+            key,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_bytes]
+            ],
+            ExpiresIn=expiration
         )
-        return filename
     except ClientError as e:
-        print(f"Error uploading to S3: {e}")
+        print(f"Error generating upload policy: {e}")
         return None
 
-def generate_s3_url(filename, bucket_name=None, expiration=3600):
+def head_s3_object(key, bucket_name=None):
     s3 = get_s3_client()
     bucket_name = bucket_name or os.getenv('S3_BUCKET_NAME')
 
+    try:
+        return s3.head_object(Bucket=bucket_name, Key=key)
+    except ClientError:
+        return None
+
+def download_s3_object(key, bucket_name=None):
+    s3 = get_s3_client()
+    bucket_name = bucket_name or os.getenv('S3_BUCKET_NAME')
+
+    try:
+        spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        s3.download_fileobj(bucket_name, key, spooled)
+        spooled.seek(0)
+        return spooled
+    except ClientError as e:
+        print(f"Error downloading from S3: {e}")
+        return None
+
+def delete_s3_object(key, bucket_name=None):
+    s3 = get_s3_client()
+    bucket_name = bucket_name or os.getenv('S3_BUCKET_NAME')
+
+    try:
+        s3.delete_object(Bucket=bucket_name, Key=key)
+    except ClientError as e:
+        print(f"Error deleting from S3: {e}")
+
+def generate_s3_url(filename, bucket_name=None, expiration=3600):
+    bucket_name = bucket_name or os.getenv('S3_BUCKET_NAME')
+    cache_key = (bucket_name, filename, expiration)
+
+    url = url_cache.get(cache_key)
+    if url:
+        return url
+
+    s3 = get_s3_client()
     try:
         url = s3.generate_presigned_url(
             'get_object',
             Params={'Bucket': bucket_name, 'Key': filename},
             ExpiresIn=expiration
         )
-        return url
     except ClientError as e:
         print(f"Error generating URL: {e}")
-        return None
\ No newline at end of file
+        return None
+
+    url_cache.put(cache_key, url, expiration)
+    record('s3_presigns')
+    return url
+
+
+def get_url_cache_stats():
+    return url_cache.stats()
\ No newline at end of file
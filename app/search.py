@@ -0,0 +1,38 @@
+from app.extensions import db
+from app.models.plant import Plant
+
+# Must match the expression indexed by ix_plants_search_document
+SEARCH_CONFIG = db.literal_column("'english'")
+
+
+def plant_document():
+    return db.func.to_tsvector(SEARCH_CONFIG, Plant.name + db.literal_column("' '") + Plant.description)
+
+
+def escape_like(term):
+    return term.replace('/', '//').replace('%', '/%').replace('_', '/_')
+
+
+def apply_plant_search(query, term, ranked=True):
+    pattern = f'%{escape_like(term)}%'
+
+    if db.engine.dialect.name != 'postgresql':
+        # Portable fallback (SQLite in tests): substring match, no ranking
+        return query.where(db.or_(
+            Plant.name.ilike(pattern, escape='/'),
+            Plant.description.ilike(pattern, escape='/')
+        ))
+
+    tsquery = db.func.websearch_to_tsquery(SEARCH_CONFIG, term)
+    document = plant_document()
+    # Full-text match via the GIN tsvector index, partial names via the trigram index
+    query = query.where(db.or_(
+        document.op('@@')(tsquery),
+        Plant.name.ilike(pattern, escape='/')
+    ))
+
+    if ranked:
+        rank = db.func.ts_rank(document, tsquery) + db.func.similarity(Plant.name, term)
+        query = query.order_by(None).order_by(rank.desc(), Plant.id)
+
+    return query
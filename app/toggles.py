@@ -0,0 +1,196 @@
+from collections import defaultdict
+import atexit
+import os
+import threading
+
+COUNTERS = {
+    'user_plant_likes': 'likes_count',
+    'user_plant_mylist': 'saves_count',
+}
+
+
+class ToggleBuffer:
+    """Coalesces like/save toggles in memory and writes them in batches (TOGGLE_WRITE_BEHIND).
+
+    A toggle is acknowledged straight away with its new state and an optimistic count. A flusher
+    thread writes the latest state per (user, plant) every TOGGLE_FLUSH_INTERVAL_MS, or as soon as
+    TOGGLE_MAX_PENDING toggles are waiting, with one counter UPDATE per plant. Pending states are
+    mirrored to the response cache's shared store when there is one, so the user's next toggle sees
+    them on any worker and only the newest state reaches the database. Toggles still pending when
+    the process is killed outright are lost; a normal shutdown flushes them.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.interval = 0.2
+        self.max_pending = 10000
+        self.shared = None
+        self._app = None
+        self._pending = {}
+        self._flushing = {}
+        self._deltas = defaultdict(int)
+        self._inflight = defaultdict(int)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # A toggle reads and writes its pair's state under one of these, so double clicks flip in turn
+        self._key_locks = [threading.Lock() for _ in range(64)]
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('TOGGLE_WRITE_BEHIND', False)
+        self.interval = app.config.get('TOGGLE_FLUSH_INTERVAL_MS', 200) / 1000
+        self.max_pending = app.config.get('TOGGLE_MAX_PENDING', 10000)
+        cache = app.extensions.get('response_cache')
+        self.shared = cache.shared if cache is not None else None
+        self._app = app
+        app.extensions['toggle_buffer'] = self
+
+    def _mirror_key(self, key):
+        return 'toggle:{}:{}:{}'.format(*key)
+
+    def _mirror_ttl(self):
+        # Long enough to outlive a flush on whichever worker holds the entry
+        return max(10, int(self.interval * 20))
+
+    def state(self, table, user_id, plant_id):
+        from app.models.relationships import link_exists
+
+        key = (table.name, user_id, plant_id)
+        with self._lock:
+            # Toggles being flushed stay visible until their commit lands
+            for states in (self._pending, self._flushing):
+                if key in states:
+                    return states[key]
+        if self.shared is not None:
+            mirrored = self.shared.get(self._mirror_key(key))
+            if mirrored is not None:
+                return _as_state(mirrored)
+        return link_exists(table, user_id, plant_id)
+
+    def toggle(self, table, user_id, plant_id):
+        key = (table.name, user_id, plant_id)
+        with self._key_locks[hash(key) % len(self._key_locks)]:
+            state = not self.state(table, user_id, plant_id)
+            with self._lock:
+                self._pending[key] = state
+                self._deltas[(table.name, plant_id)] += 1 if state else -1
+                pending = len(self._pending)
+            if self.shared is not None:
+                self.shared.set(self._mirror_key(key), b'1' if state else b'0', self._mirror_ttl())
+        self._ensure_flusher()
+        if pending >= self.max_pending:
+            self._wake.set()
+        return state
+
+    def pending_delta(self, table, plant_id):
+        with self._lock:
+            return self._deltas[(table.name, plant_id)] + self._inflight[(table.name, plant_id)]
+
+    def overlay(self, table, user_id, plant_ids, linked_ids):
+        """Apply this process's unflushed toggles to a set of linked plant ids read from the database."""
+        with self._lock:
+            if not self._pending and not self._flushing:
+                return linked_ids
+            for plant_id in plant_ids:
+                key = (table.name, user_id, plant_id)
+                state = self._pending[key] if key in self._pending else self._flushing.get(key)
+                if state is True:
+                    linked_ids.add(plant_id)
+                elif state is False:
+                    linked_ids.discard(plant_id)
+        return linked_ids
+
+    def _ensure_flusher(self):
+        # Started lazily so each forked worker runs its own flusher
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='toggle-flusher', daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every pending toggle; returns how many links actually changed."""
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._flushing = batch
+            deltas, self._deltas = self._deltas, defaultdict(int)
+            for key, delta in deltas.items():
+                self._inflight[key] += delta
+        if not batch:
+            return 0
+
+        try:
+            with self._app.app_context():
+                return self._apply(batch)
+        except Exception as e:
+            print(f"Flushing {len(batch)} toggle(s) failed, will retry: {e!r}")
+            with self._lock:
+                # Toggles made while this batch was in flight are newer and win
+                for key, state in batch.items():
+                    self._pending.setdefault(key, state)
+                for key, delta in deltas.items():
+                    self._deltas[key] += delta
+            return 0
+        finally:
+            with self._lock:
+                self._flushing = {}
+                for key, delta in deltas.items():
+                    self._inflight[key] -= delta
+                    if not self._inflight[key]:
+                        del self._inflight[key]
+
+    def _apply(self, batch):
+        from app.extensions import db, response_cache
+        from app.models.plant import Plant
+        from app.models.relationships import user_plant_likes, user_plant_mylist, add_links, remove_links
+
+        tables = {table.name: table for table in (user_plant_likes, user_plant_mylist)}
+        additions = defaultdict(list)
+        removals = defaultdict(list)
+        for key, state in batch.items():
+            # Another worker took a newer toggle for this pair; its flush writes that state instead
+            if self.shared is not None:
+                mirrored = self.shared.get(self._mirror_key(key))
+                if mirrored is not None and _as_state(mirrored) != state:
+                    continue
+            table_name, user_id, plant_id = key
+            (additions if state else removals)[table_name].append((user_id, plant_id))
+
+        counts = defaultdict(lambda: defaultdict(int))
+        for table_name, table in tables.items():
+            for plant_id in add_links(table, additions[table_name]):
+                counts[plant_id][COUNTERS[table_name]] += 1
+            for plant_id in remove_links(table, removals[table_name]):
+                counts[plant_id][COUNTERS[table_name]] -= 1
+
+        changed = {plant_id: {name: delta for name, delta in deltas.items() if delta}
+                   for plant_id, deltas in counts.items()}
+        for plant_id, deltas in changed.items():
+            if deltas:
+                Plant.adjust_counts(plant_id, **deltas)
+        db.session.commit()
+
+        for plant_id, deltas in changed.items():
+            if deltas:
+                response_cache.invalidate_plant(plant_id, listing='likes_count' in deltas)
+        return sum(abs(delta) for deltas in changed.values() for delta in deltas.values())
+
+
+def _as_state(value):
+    return value in (b'1', '1', 1, True)
@@ -0,0 +1,142 @@
+import tempfile
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import MultipartDecoder, NeedData, Field, File, Data, Epilogue
+
+CHUNK_SIZE = 64 * 1024
+MAX_FIELD_BYTES = 64 * 1024
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class FieldTooLarge(Exception):
+    pass
+
+
+class MalformedUpload(Exception):
+    pass
+
+
+class MultipartStream:
+    """Pull-based multipart/form-data reader over the raw request stream.
+
+    Text fields are collected into `form`; file parts are handed out as readers that
+    pull from the socket on demand, so nothing is spooled to memory or disk by Werkzeug.
+    """
+
+    def __init__(self, stream, boundary):
+        self.form = {}
+        self._stream = stream
+        self._decoder = MultipartDecoder(boundary)
+        self._done = False
+
+    @classmethod
+    def from_request(cls, request):
+        mimetype, options = parse_options_header(request.headers.get('Content-Type', ''))
+        if mimetype != 'multipart/form-data' or 'boundary' not in options:
+            return None
+        return cls(request.stream, options['boundary'].encode())
+
+    def _next_event(self):
+        while True:
+            event = self._decoder.next_event()
+            if not isinstance(event, NeedData):
+                return event
+            if self._decoder.complete:
+                raise MalformedUpload('Multipart body ended unexpectedly')
+            chunk = self._stream.read(CHUNK_SIZE)
+            self._decoder.receive_data(chunk or None)
+
+    def _read_field(self, name):
+        value = bytearray()
+        while True:
+            event = self._next_event()
+            value.extend(event.data)
+            if len(value) > MAX_FIELD_BYTES:
+                raise FieldTooLarge(f'Field {name} exceeds {MAX_FIELD_BYTES // 1024}KB limit')
+            if not event.more_data:
+                break
+        self.form[name] = value.decode('utf-8', errors='replace')
+
+    def next_file(self, name):
+        """Collect fields up to the file part called `name` and return a reader for it."""
+        while not self._done:
+            event = self._next_event()
+            if isinstance(event, Field):
+                self._read_field(event.name)
+            elif isinstance(event, File):
+                part = FilePart(self, event)
+                # Browsers send an empty part with no filename for a file input left blank
+                if event.name == name and event.filename:
+                    return part
+                part.drain()
+            elif isinstance(event, Epilogue):
+                self._done = True
+        return None
+
+    def finish(self):
+        # Reads any fields that came after the file part
+        self.next_file(None)
+
+
+class FilePart:
+    def __init__(self, multipart, event, max_bytes=None):
+        self.filename = event.filename
+        self.content_type = event.headers.get('Content-Type', 'application/octet-stream')
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self._multipart = multipart
+        self._buffer = bytearray()
+        self._finished = False
+
+    def _fill(self):
+        event = self._multipart._next_event()
+        if not isinstance(event, Data):
+            raise MalformedUpload('Expected file data')
+        self._buffer.extend(event.data)
+        self.bytes_read += len(event.data)
+        if self.max_bytes is not None and self.bytes_read > self.max_bytes:
+            raise UploadTooLarge(f'File exceeds {self.max_bytes} bytes')
+        self._finished = not event.more_data
+
+    def read(self, size=-1):
+        while not self._finished and (size < 0 or len(self._buffer) < size):
+            self._fill()
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def drain(self):
+        self.max_bytes = None
+        while self.read(CHUNK_SIZE):
+            pass
+
+    def spool(self):
+        # Copies the part to a temp file for work that happens after the request
+        spooled = new_spool()
+        while chunk := self.read(CHUNK_SIZE):
+            spooled.write(chunk)
+        spooled.seek(0)
+        return spooled
+
+
+class TeeReader:
+    """Copies everything read from `reader` into `sink`."""
+
+    def __init__(self, reader, sink):
+        self._reader = reader
+        self._sink = sink
+
+    def read(self, size=-1):
+        data = self._reader.read(size)
+        self._sink.write(data)
+        return data
+
+
+def new_spool():
+    # Stays in memory up to SPOOL_MEMORY_BYTES, then rolls over to a temp file
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
@@ -6,16 +6,76 @@ load_dotenv()
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Each gunicorn worker process has its own pool: one connection per request thread plus headroom
+    # for background upload threads. Keep WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW) under max_connections.
+    # gevent workers run far more requests than that per process, so they queue for a fixed-size pool instead.
+    GUNICORN_WORKER_CLASS = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+    GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', 1))
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10 if GUNICORN_WORKER_CLASS == 'gevent' else GUNICORN_THREADS + 2))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 2))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True') == 'True'
+    DB_POOL_WAIT_WARNING_MS = int(os.getenv('DB_POOL_WAIT_WARNING_MS', 100))
+    DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', 5))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 15000))
+    # gunicorn.conf.py sets this to `web`
+    APP_PROCESS = os.getenv('APP_PROCESS', 'cli')
+    DB_PGBOUNCER = os.getenv('DB_PGBOUNCER', 'False') == 'True'
+    OPS_TOKEN = os.getenv('OPS_TOKEN')
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'auto')
+    SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'False') == 'True'
+    SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', 200))
+    JOBS_BACKEND = os.getenv('JOBS_BACKEND', 'thread')
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 5))
+    JOB_BACKOFF_SECONDS = int(os.getenv('JOB_BACKOFF_SECONDS', 2))
+    JOB_LOCK_TIMEOUT = int(os.getenv('JOB_LOCK_TIMEOUT', 600))
+    TOGGLE_WRITE_BEHIND = os.getenv('TOGGLE_WRITE_BEHIND', 'False') == 'True'
+    TOGGLE_FLUSH_INTERVAL_MS = int(os.getenv('TOGGLE_FLUSH_INTERVAL_MS', 200))
+    TOGGLE_MAX_PENDING = int(os.getenv('TOGGLE_MAX_PENDING', 10000))
+    RANKING_SIZE = int(os.getenv('RANKING_SIZE', 500))
+    TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', 24))
+    TRENDING_WINDOW_HOURS = int(os.getenv('TRENDING_WINDOW_HOURS', 168))
+    TRENDING_COMMENT_WEIGHT = float(os.getenv('TRENDING_COMMENT_WEIGHT', 2))
+    SQLALCHEMY_REPLICA_URIS = [uri for uri in os.getenv('SQLALCHEMY_REPLICA_URIS', '').split(',') if uri]
+    REPLICA_STRATEGY = os.getenv('REPLICA_STRATEGY', 'round_robin')
+    REPLICA_READ_YOUR_WRITES = int(os.getenv('REPLICA_READ_YOUR_WRITES', 5))
+    REPLICA_RETRY_AFTER = int(os.getenv('REPLICA_RETRY_AFTER', 30))
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'default_jwt_secret')
     SECRET_KEY = os.getenv('FLASK_SECRET_KEY', 'default_flask_secret')
+    IDENTITY_CACHE_TTL = int(os.getenv('IDENTITY_CACHE_TTL', 60))
+    IDENTITY_FROM_JWT_CLAIMS = os.getenv('IDENTITY_FROM_JWT_CLAIMS', 'False') == 'True'
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE_DEPTH = int(os.getenv('PASSWORD_HASH_QUEUE_DEPTH', 32))
+    PASSWORD_HASH_TIMEOUT = int(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+    COMMENTS_PAGE_SIZE = int(os.getenv('COMMENTS_PAGE_SIZE', 5))
+    PLANT_BATCH_MAX_IDS = int(os.getenv('PLANT_BATCH_MAX_IDS', 50))
+    CURSOR_PAGE_MAX = int(os.getenv('CURSOR_PAGE_MAX', 100))
+    ETAG_URL_WINDOW = int(os.getenv('ETAG_URL_WINDOW', 1800))
+    COMMENT_IMAGE_MAX_BYTES = int(os.getenv('COMMENT_IMAGE_MAX_BYTES', 5 * 1024 * 1024))  # 5MB
+    COMMENT_IMAGE_UPLOAD_MODE = os.getenv('COMMENT_IMAGE_UPLOAD_MODE', 'inline')
+    DIRECT_UPLOAD_EXPIRATION = int(os.getenv('DIRECT_UPLOAD_EXPIRATION', 900))
+    PLANT_IMAGE_UPLOADER_IDS = {int(user_id) for user_id in os.getenv('PLANT_IMAGE_UPLOADER_IDS', '').split(',') if user_id}
+    # Lets Werkzeug reject oversized bodies from Content-Length before reading them
+    MAX_CONTENT_LENGTH = COMMENT_IMAGE_MAX_BYTES + 64 * 1024
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True') == 'True'
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 30))
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 1024))
+    RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'local')
+    RESPONSE_CACHE_REDIS_URL = os.getenv('RESPONSE_CACHE_REDIS_URL')
 
 class DevelopmentConfig(Config):
     DEBUG = os.getenv('FLASK_DEBUG', 'True') == 'True'
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'False') == 'True'
+    SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'True') == 'True'
 
 class ProductionConfig(Config):
     DEBUG = False
 
 config = {
-    'development': Config,
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
     'default': Config
-}
\ No newline at end of file
+}
@@ -0,0 +1,20 @@
+import os
+
+# Pool sizing in config.py assumes one database connection per thread in each worker process
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+# Lets the app apply web-only settings such as DB_STATEMENT_TIMEOUT_MS; workers inherit it from the master
+os.environ['APP_PROCESS'] = 'web'
+
+# `gevent` serves many requests per process: DB, S3 and HTTP waits yield to other requests
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 200))
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # psycopg2 is a C extension that monkey patching can't reach; make it wait on the gevent hub instead
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
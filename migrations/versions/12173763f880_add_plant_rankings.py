@@ -0,0 +1,86 @@
+"""Add plant rankings, like timestamps and like removals
+
+Revision ID: 12173763f880
+Revises: 4bc93eb56526
+Create Date: 2026-10-18 16:02:31.954170
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '12173763f880'
+down_revision = '4bc93eb56526'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # Incremental trending refreshes read likes and comments created since the last run
+    ('ix_user_plant_likes_created_at', 'user_plant_likes', ['created_at']),
+    ('ix_comments_created_at', 'comments', ['created_at']),
+]
+
+
+def drop_invalid_index(name, table):
+    # A failed CONCURRENTLY build leaves an INVALID index that IF NOT EXISTS would skip; drop it so it's rebuilt
+    if op.get_context().dialect.name != 'postgresql' or op.get_context().as_sql:
+        return
+    query = sa.text(
+        "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+        "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+    )
+    if op.get_bind().execute(query, {'name': name}).scalar():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def upgrade():
+    # Existing likes get the migration time; their age is unknown
+    with op.batch_alter_table('user_plant_likes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), server_default=sa.text("(now() AT TIME ZONE 'utc')"), nullable=False))
+
+    with op.batch_alter_table('plants', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('trending_score', sa.Float(), nullable=True))
+
+    op.create_table('plant_rankings',
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('position', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('plant_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['plant_id'], ['plants.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('kind', 'position')
+    )
+    op.create_table('like_removals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('plant_id', sa.Integer(), nullable=False),
+    sa.Column('liked_at', sa.DateTime(), nullable=False),
+    sa.Column('removed_at', sa.DateTime(), server_default=sa.text("(now() AT TIME ZONE 'utc')"), nullable=False),
+    sa.ForeignKeyConstraint(['plant_id'], ['plants.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('like_removals', schema=None) as batch_op:
+        batch_op.create_index('ix_like_removals_removed_at', ['removed_at'], unique=False)
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            drop_invalid_index(name, table)
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    with op.batch_alter_table('like_removals', schema=None) as batch_op:
+        batch_op.drop_index('ix_like_removals_removed_at')
+
+    op.drop_table('like_removals')
+    op.drop_table('plant_rankings')
+    with op.batch_alter_table('plants', schema=None) as batch_op:
+        batch_op.drop_column('trending_score')
+
+    with op.batch_alter_table('user_plant_likes', schema=None) as batch_op:
+        batch_op.drop_column('created_at')
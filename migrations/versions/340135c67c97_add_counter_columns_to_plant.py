@@ -0,0 +1,37 @@
+"""Add counter columns to plant
+
+Revision ID: 340135c67c97
+Revises: 2e5c7fa1c162
+Create Date: 2026-10-18 09:12:41.508213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '340135c67c97'
+down_revision = '2e5c7fa1c162'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('plants', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('likes_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('saves_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('comments_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute("""
+        UPDATE plants SET
+            likes_count = (SELECT COUNT(*) FROM user_plant_likes WHERE user_plant_likes.plant_id = plants.id),
+            saves_count = (SELECT COUNT(*) FROM user_plant_mylist WHERE user_plant_mylist.plant_id = plants.id),
+            comments_count = (SELECT COUNT(*) FROM comments WHERE comments.plant_id = plants.id)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('plants', schema=None) as batch_op:
+        batch_op.drop_column('comments_count')
+        batch_op.drop_column('saves_count')
+        batch_op.drop_column('likes_count')
@@ -0,0 +1,26 @@
+"""Add version to plant
+
+Revision ID: 607589ca0149
+Revises: de1bb9804661
+Create Date: 2026-10-18 10:48:52.117403
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '607589ca0149'
+down_revision = 'de1bb9804661'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('plants', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('plants', schema=None) as batch_op:
+        batch_op.drop_column('version')
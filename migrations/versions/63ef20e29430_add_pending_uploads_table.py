@@ -0,0 +1,43 @@
+"""Add pending_uploads table
+
+Revision ID: 63ef20e29430
+Revises: ec7d92d06f6a
+Create Date: 2026-10-18 13:02:26.901447
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '63ef20e29430'
+down_revision = 'ec7d92d06f6a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pending_uploads',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('purpose', sa.String(length=16), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=False),
+    sa.Column('max_bytes', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('plant_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['plant_id'], ['plants.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('key')
+    )
+    with op.batch_alter_table('pending_uploads', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pending_uploads_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pending_uploads', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pending_uploads_expires_at'))
+
+    op.drop_table('pending_uploads')
@@ -0,0 +1,26 @@
+"""Add image_status to comment
+
+Revision ID: adbcc5e7849e
+Revises: 607589ca0149
+Create Date: 2026-10-18 11:36:05.842216
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'adbcc5e7849e'
+down_revision = '607589ca0149'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_status', sa.String(length=16), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_column('image_status')
@@ -0,0 +1,68 @@
+"""Add plant search indexes
+
+Revision ID: de1bb9804661
+Revises: 340135c67c97
+Create Date: 2026-10-18 10:03:17.264930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'de1bb9804661'
+down_revision = '340135c67c97'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = ['ix_plants_search_document', 'ix_plants_name_trgm']
+
+
+def drop_invalid_index(name, table):
+    # A failed CONCURRENTLY build leaves an INVALID index behind; drop it so a rerun builds it again
+    if op.get_context().as_sql:
+        return
+    query = sa.text(
+        "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+        "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+    )
+    if op.get_bind().execute(query, {'name': name}).scalar():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def upgrade():
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # CONCURRENTLY keeps plants writable while the GIN indexes build, but can't run in a transaction
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            drop_invalid_index(name, 'plants')
+        op.create_index(
+            'ix_plants_search_document',
+            'plants',
+            [sa.text("to_tsvector('english', name || ' ' || description)")],
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.create_index(
+            'ix_plants_name_trgm',
+            'plants',
+            ['name'],
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade():
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        for name in reversed(INDEXES):
+            op.drop_index(name, table_name='plants', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,38 @@
+"""Add image variants
+
+Revision ID: ec7d92d06f6a
+Revises: adbcc5e7849e
+Create Date: 2026-10-18 12:20:44.631958
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ec7d92d06f6a'
+down_revision = 'adbcc5e7849e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('plants', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('main_image_variants', sa.JSON(), nullable=True))
+
+    with op.batch_alter_table('plant_images', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_variants', sa.JSON(), nullable=True))
+
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_variants', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_column('image_variants')
+
+    with op.batch_alter_table('plant_images', schema=None) as batch_op:
+        batch_op.drop_column('image_variants')
+
+    with op.batch_alter_table('plants', schema=None) as batch_op:
+        batch_op.drop_column('main_image_variants')
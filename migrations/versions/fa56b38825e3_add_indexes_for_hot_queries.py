@@ -0,0 +1,53 @@
+"""Add indexes for hot queries
+
+Revision ID: fa56b38825e3
+Revises: 63ef20e29430
+Create Date: 2026-10-18 14:21:47.318052
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'fa56b38825e3'
+down_revision = '63ef20e29430'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # Comment feed: WHERE plant_id = ? ORDER BY created_at DESC, id DESC
+    ('ix_comments_plant_id_created_at_id', 'comments', ['plant_id', 'created_at', 'id']),
+    ('ix_comments_user_id', 'comments', ['user_id']),
+    ('ix_plant_images_plant_id', 'plant_images', ['plant_id']),
+    # The primary keys lead with user_id; per-plant counts need the other direction
+    ('ix_user_plant_likes_plant_id_user_id', 'user_plant_likes', ['plant_id', 'user_id']),
+    ('ix_user_plant_mylist_plant_id_user_id', 'user_plant_mylist', ['plant_id', 'user_id']),
+]
+
+
+def drop_invalid_index(name, table):
+    # A failed CONCURRENTLY build leaves an INVALID index that IF NOT EXISTS would skip; drop it so it's rebuilt
+    if op.get_context().dialect.name != 'postgresql' or op.get_context().as_sql:
+        return
+    query = sa.text(
+        "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+        "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+    )
+    if op.get_bind().execute(query, {'name': name}).scalar():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def upgrade():
+    # CONCURRENTLY keeps the tables writable while the indexes build, but can't run in a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            drop_invalid_index(name, table)
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)